@@ -0,0 +1,105 @@
+import argparse
+import gzip
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from customer_index import CustomerIndex, normalize_customer_ids
+from recommender import BatchRecommender, CF_MODES, RESULT_LISTS, load_models
+
+# --- Batch Recommendation Export ---
+# Contoh:
+#   python batch_recommend.py --cluster 1 --out reco_vip.csv.gz
+#   python batch_recommend.py --all --workers 8 --format jsonl --out reco_all.jsonl
+#   python batch_recommend.py --ids target_ids.txt --out reco_campaign.csv
+
+_BATCH = None
+
+
+def _init_worker(batch):
+    global _BATCH
+    _BATCH = batch
+
+
+def _format_chunk(args):
+    chunk_ids, fmt, include_header = args
+    frame = _BATCH.to_frame(_BATCH.recommend(chunk_ids), sep=" | " if fmt == "csv" else None)
+    if fmt == "csv":
+        return frame.to_csv(index=False, header=include_header), len(frame)
+    return "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in frame.to_dict("records")), len(frame)
+
+
+def read_target_ids(args, rfm):
+    if args.ids:
+        raw = pd.read_csv(args.ids, header=None, usecols=[0], dtype=str)[0]
+        ids = normalize_customer_ids(raw)
+        return ids.dropna().to_numpy(dtype=np.int64)
+    ids = normalize_customer_ids(rfm["Customer ID"])
+    mask = ids.notna().to_numpy()
+    if args.cluster:
+        mask = mask & rfm["Cluster"].isin(args.cluster).to_numpy()
+    return ids[mask].to_numpy(dtype=np.int64)
+
+
+def open_output(path):
+    if path.endswith(".gz"): return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export(ids, batch, out_path, fmt="csv", chunk_size=100_000, workers=1):
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    tasks = [(c, fmt, i == 0) for i, c in enumerate(chunks)]
+    written = 0
+    with open_output(out_path) as f:
+        if workers > 1 and len(tasks) > 1:
+            with mp.Pool(workers, initializer=_init_worker, initargs=(batch,)) as pool:
+                # imap menjaga urutan chunk; hasil ditulis begitu chunk selesai (streaming)
+                for text, count in pool.imap(_format_chunk, tasks):
+                    f.write(text)
+                    written += count
+        else:
+            _init_worker(batch)
+            for task in tasks:
+                text, count = _format_chunk(task)
+                f.write(text)
+                written += count
+    return written
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export rekomendasi produk untuk banyak customer sekaligus.")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="Semua customer di rfm.pkl")
+    target.add_argument("--cluster", type=int, nargs="+", help="Semua customer di cluster tertentu")
+    target.add_argument("--ids", help="File berisi Customer ID (satu per baris / kolom pertama CSV)")
+    p.add_argument("--out", required=True, help="File output (.csv / .jsonl, tambahkan .gz untuk kompresi)")
+    p.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    p.add_argument("-n", type=int, default=5, help="Jumlah produk per list")
+    p.add_argument("--cf-mode", choices=CF_MODES, default="basket", help="basket = seluruh riwayat belanja, last_item = produk terakhir")
+    p.add_argument("--chunk-size", type=int, default=100_000)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--rfm", default="rfm.pkl")
+    args = p.parse_args()
+
+    fmt = args.format or ("jsonl" if ".jsonl" in args.out else "csv")
+
+    t0 = time.perf_counter()
+    rfm = pd.read_pickle(args.rfm)
+    topN_cluster, user_item_matrix, item_neighbors = load_models()
+    cust_idx = CustomerIndex(rfm, user_item_matrix.index)
+    batch = BatchRecommender(cust_idx, topN_cluster, user_item_matrix, item_neighbors, n=args.n, cf_mode=args.cf_mode)
+    del user_item_matrix
+    t1 = time.perf_counter()
+
+    ids = read_target_ids(args, rfm)
+    written = export(ids, batch, args.out, fmt=fmt, chunk_size=args.chunk_size, workers=args.workers)
+    t2 = time.perf_counter()
+    print(f"Load model: {t1 - t0:.1f}s | Export {written:,} customer ({', '.join(RESULT_LISTS)}) -> {args.out} dalam {t2 - t1:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from perf import rss_bytes
+
+# --- Benchmark Hot Path Dashboard ---
+# Mengukur waktu (p50/p95/mean) dan puncak alokasi memori untuk jalur yang dipakai
+# dashboard: load artefak, filter sidebar, export, agregasi EDA, Cluster Insight, recommend_products.
+# Hasil ditulis ke JSON supaya dua versi bisa dibandingkan (--compare).
+# peak_alloc_mb = puncak tracemalloc (Python + numpy); buffer Arrow tidak tercatat, lihat rss_delta_mb.
+#
+#   python synthetic.py --scale m --out bench_data/m
+#   python benchmark.py --data bench_data/m --json bench_m.json
+#   python benchmark.py --data bench_data/m --compare bench_m.json --tolerance 0.2
+
+
+def rss_mb():
+    return rss_bytes() / 2**20
+
+
+def measure(name, fn, repeats=5, warmup=1, setup=None):
+    # fn(ctx) dijalankan `repeats` kali tanpa tracemalloc (timing), lalu sekali dengan tracemalloc (memori)
+    for _ in range(warmup):
+        fn(setup() if setup else None)
+    times = []
+    for _ in range(repeats):
+        ctx = setup() if setup else None
+        gc.collect()
+        t0 = time.perf_counter()
+        fn(ctx)
+        times.append(time.perf_counter() - t0)
+    ctx = setup() if setup else None
+    gc.collect()
+    rss0 = rss_mb()
+    tracemalloc.start()
+    fn(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = np.array(times)
+    return {
+        "name": name,
+        "repeats": repeats,
+        "mean_s": float(times.mean()),
+        "p50_s": float(np.percentile(times, 50)),
+        "p95_s": float(np.percentile(times, 95)),
+        "min_s": float(times.min()),
+        "peak_alloc_mb": round(peak / 2**20, 3),
+        "rss_delta_mb": round(rss_mb() - rss0, 3),
+    }
+
+
+# --- Cases ---
+def cluster_insight(df_full, rfm, cluster):
+    # Perhitungan yang sama dengan halaman Cluster Insight
+    c_df = df_full[df_full["Cluster"] == cluster]
+    c_rfm = rfm[rfm["Cluster"] == cluster]
+    return {
+        "population": c_rfm.shape[0],
+        "revenue": c_df["Revenue"].sum(),
+        "avg_basket": c_df.groupby("Invoice", observed=True)["Revenue"].sum().mean(),
+        "top_country": c_df["Country"].mode()[0] if not c_df.empty else "-",
+        "rfm_mean": c_rfm[["Recency", "Frequency", "Monetary"]].mean(),
+        "trend": c_df.groupby("YearMonth", observed=True)["Revenue"].sum(),
+        "top_products": c_df.groupby("Description", observed=True)["Quantity"].sum().nlargest(5),
+    }
+
+
+def run_suite(data_dir, repeats=5, n_customers=200, seed=0, only=None):
+    from cluster_profiles import build_cluster_profiles, get_profile
+    from customer_index import CustomerIndex
+    from export import export_filtered
+    from recommender import CF_MODES, recommend_products
+    from rfm_history import HISTORY_COLUMNS
+    from storage import DATA_DIR, head_transactions, read_transactions
+    from store import APP_COLUMNS, ArtifactStore
+
+    path = lambda name: os.path.join(data_dir, name)
+    rng = np.random.default_rng(seed)
+    results = []
+
+    def add(name, fn, **kw):
+        if only and not any(name.startswith(o) for o in only): return
+        r = measure(name, fn, repeats=repeats, **kw)
+        print(f"{name:<40} p50 {r['p50_s'] * 1000:>10.2f} ms | p95 {r['p95_s'] * 1000:>10.2f} ms | peak {r['peak_alloc_mb']:>9.1f} MB")
+        results.append(r)
+
+    # 1. Load artefak (store baru setiap repeat = cold load per proses)
+    for attr in ["rfm", "transactions", "rollup", "cluster_profiles", "rfm_history", "catalog", "models", "customer_index"]:
+        add(f"load.{attr}", lambda s, a=attr: getattr(s, a), setup=lambda: ArtifactStore(data_dir))
+
+    store = ArtifactStore(data_dir)
+    df_full, rfm, cube, profiles = store.transactions, store.rfm, store.rollup, store.cluster_profiles
+    topN, u_matrix, i_nbrs = store.models
+    cust_idx = CustomerIndex(rfm, u_matrix.index)
+
+    # 2. Filter sidebar: pushdown ke Parquet vs mask in-memory
+    countries = list(rng.choice(cube.countries, min(3, len(cube.countries)), replace=False))
+    months = list(cube.months[-6:])
+    clusters = list(cube.clusters[:2])
+    add("filter.parquet_pushdown", lambda _: read_transactions(path(DATA_DIR), countries=countries, months=months, clusters=clusters))
+    add("filter.parquet_pushdown_app_columns", lambda _: read_transactions(path(DATA_DIR), columns=APP_COLUMNS, countries=countries, months=months, clusters=clusters))
+    add("filter.sample_head", lambda _: head_transactions(path(DATA_DIR), 5, countries, months, clusters))
+    add("filter.in_memory", lambda _: df_full[df_full["Country"].isin(countries) & df_full["YearMonth"].isin(months) & df_full["Cluster"].isin(clusters)])
+
+    add("export.csv_gz", lambda _: os.remove(export_filtered("csv.gz", countries, months, clusters, path=path(DATA_DIR))))
+    add("export.parquet", lambda _: os.remove(export_filtered("parquet", countries, months, clusters, path=path(DATA_DIR))))
+
+    # 3. Agregasi EDA
+    add("eda.summarize_all", lambda _: cube.summarize())
+    add("eda.summarize_filtered", lambda _: cube.summarize(countries, months, clusters))
+    add("eda.rfm_scatter", lambda _: rfm[rfm["Customer ID"].isin(cube.summarize(countries, months, clusters)["active_customers"])])
+
+    # 4. Cluster Insight (semua cluster)
+    add("cluster_insight.all_clusters", lambda _: [cluster_insight(df_full, rfm, c) for c in cube.clusters])
+    add("cluster_insight.snapshot_lookup", lambda _: [get_profile(profiles, c) for c in cube.clusters])
+    add("cluster_insight.snapshot_build", lambda _: build_cluster_profiles(df_full, rfm))
+
+    # 5. RFM as-of: index prefix sum vs groupby transaksi (90 hari sebelum invoice terakhir)
+    history = store.rfm_history
+    as_of = history.reference_date - pd.Timedelta(days=90)
+    tx_dates = read_transactions(path(DATA_DIR), columns=HISTORY_COLUMNS)
+    add("rfm_asof.index_all_customers", lambda _: history.rfm(as_of))
+    add("rfm_asof.index_window_90d", lambda _: history.rfm(as_of, as_of - pd.Timedelta(days=90)))
+    add("rfm_asof.groupby_all_customers", lambda _: tx_dates[tx_dates["InvoiceDate"] < as_of].groupby("Customer ID").agg(
+        LastPurchase=("InvoiceDate", "max"), Frequency=("Invoice", "nunique"), Monetary=("Revenue", "sum")))
+
+    # 6. recommend_products: latency per customer (p50/p95 per panggilan)
+    ids = rng.choice(rfm["Customer ID"].dropna().astype("int64").to_numpy(), min(n_customers, len(rfm)), replace=False)
+    for mode in CF_MODES:
+        name = f"recommend_products.{mode}"
+        if only and not any(name.startswith(o) for o in only): continue
+        per_call = []
+        for cid in ids:
+            t0 = time.perf_counter()
+            recommend_products(cid, cust_idx, topN, u_matrix, i_nbrs, cf_mode=mode)
+            per_call.append(time.perf_counter() - t0)
+        r = measure(name + ".batch", lambda _, m=mode: [recommend_products(c, cust_idx, topN, u_matrix, i_nbrs, cf_mode=m) for c in ids], repeats=1)
+        per_call = np.array(per_call)
+        r.update({"name": name, "repeats": len(per_call), "mean_s": float(per_call.mean()), "p50_s": float(np.percentile(per_call, 50)),
+                  "p95_s": float(np.percentile(per_call, 95)), "min_s": float(per_call.min())})
+        print(f"{name:<40} p50 {r['p50_s'] * 1000:>10.2f} ms | p95 {r['p95_s'] * 1000:>10.2f} ms | peak {r['peak_alloc_mb']:>9.1f} MB")
+        results.append(r)
+
+    # 7. Customer 360: rakit penuh vs hit LRU (customer yang sama)
+    from customer360 import Customer360Cache, assemble
+    c360 = Customer360Cache()
+    add("customer360.assemble", lambda _: [assemble(store, c) for c in ids])
+    add("customer360.cache_hit", lambda _: [c360.get(store, c) for c in ids], warmup=1)
+
+    meta_data = {"rows": int(len(df_full)), "customers": int(len(rfm)), "products": int(len(u_matrix.items)),
+                 "countries": len(cube.countries), "months": len(cube.months), "clusters": len(cube.clusters)}
+    return results, meta_data
+
+
+def environment():
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: commit = None
+    return {
+        "commit": commit,
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current, baseline_path, tolerance=0.2):
+    # Bandingkan p50 dengan baseline; return daftar case yang lebih lambat dari (1 + tolerance)
+    with open(baseline_path) as f: baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\n{'case':<40} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for r in current:
+        b = baseline.get(r["name"])
+        if b is None or b["p50_s"] <= 0: continue
+        ratio = r["p50_s"] / b["p50_s"]
+        flag = " <-- regresi" if ratio > 1 + tolerance else ""
+        print(f"{r['name']:<40} {b['p50_s'] * 1000:>10.2f}ms {r['p50_s'] * 1000:>10.2f}ms {ratio:>7.2f}x{flag}")
+        if flag: regressions.append(r["name"])
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark waktu & memori jalur utama dashboard.")
+    p.add_argument("--data", default=None, help="Folder artefak (default: generate --scale ke bench_data/<scale>)")
+    p.add_argument("--scale", default="s", help="Preset synthetic.py bila --data tidak diberikan")
+    p.add_argument("--repeats", type=int, default=5)
+    p.add_argument("--customers", type=int, default=200, help="Jumlah customer sampel untuk recommend_products")
+    p.add_argument("--only", nargs="*", default=None, help="Prefix nama case, mis. load eda filter")
+    p.add_argument("--json", default=None, help="Tulis hasil ke file JSON")
+    p.add_argument("--compare", default=None, help="JSON baseline untuk deteksi regresi")
+    p.add_argument("--tolerance", type=float, default=0.2, help="Batas perlambatan p50 relatif terhadap baseline")
+    args = p.parse_args()
+
+    data_dir = args.data
+    if data_dir is None:
+        from synthetic import SCALES, build
+        data_dir = os.path.join("bench_data", args.scale)
+        if not os.path.isdir(os.path.join(data_dir, "rollup")): build(data_dir, *SCALES[args.scale])
+
+    results, data = run_suite(data_dir, repeats=args.repeats, n_customers=args.customers, only=args.only)
+    report = {"environment": environment(), "data": dict(data, path=os.path.abspath(data_dir)), "results": results}
+    if args.json:
+        with open(args.json, "w") as f: json.dump(report, f, indent=2)
+        print(f"Hasil ditulis ke {args.json}")
+    if args.compare and compare(results, args.compare, args.tolerance): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
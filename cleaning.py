@@ -0,0 +1,37 @@
+import pandas as pd
+
+# --- Cleaning Rules (sama dengan notebook) ---
+# 1. Drop Customer ID kosong      4. StockCode non-produk (POST, DOT, M, ...)
+# 2. Buang invoice batal ('C...')  5. Drop duplikat
+# 3. Price > 0                     6. Revenue & YearMonth
+# Semua filter baris digabung menjadi satu mask supaya frame hanya di-copy sekali.
+
+RAW_COLUMNS = ["Invoice", "StockCode", "Description", "Quantity", "InvoiceDate", "Price", "Customer ID", "Country"]
+STOCKCODE_TEXT = r"^[a-zA-Z''-'\s]{1,40}$"
+STOCKCODE_WORD = r"[a-zA-Z]{3,}"
+
+
+def valid_rows_mask(df):
+    invoice = df["Invoice"].astype(str)
+    stock = df["StockCode"].astype(str)
+    return (
+        df["Customer ID"].notna()
+        & ~invoice.str.startswith("C")
+        & (pd.to_numeric(df["Price"], errors="coerce") > 0)
+        & ~stock.str.contains(STOCKCODE_TEXT, na=False)
+        & ~stock.str.contains(STOCKCODE_WORD, na=False)
+    )
+
+
+def derive_columns(df):
+    df["Customer ID"] = pd.to_numeric(df["Customer ID"], errors="coerce").astype("int64")
+    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"])
+    df["Revenue"] = df["Quantity"] * df["Price"]
+    df["YearMonth"] = df["InvoiceDate"].dt.to_period("M").astype(str)
+    return df
+
+
+def clean_transactions(df, drop_duplicates=True):
+    out = df.loc[valid_rows_mask(df), RAW_COLUMNS]
+    if drop_duplicates: out = out.drop_duplicates()
+    return derive_columns(out.reset_index(drop=True))
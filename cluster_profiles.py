@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# --- Cluster Profile Snapshot ---
+# Semua angka halaman Cluster Insight (populasi, revenue, avg basket, negara dominan,
+# rata-rata RFM cluster vs global, tren revenue bulanan, top 5 produk) dihitung sekali
+# saat artefak dibangun, lalu disimpan sebagai satu file JSON kecil ber-versi.
+# Dashboard cukup membaca dict per cluster, tanpa filter / groupby df_full per pilihan.
+# Agregat aditif (revenue, jumlah invoice, baris per negara, tren) ikut disimpan sehingga
+# incremental.py cukup menambahkan batch baru (update_cluster_profiles), tanpa scan histori.
+
+PROFILES_FILE = "cluster_profiles.json"
+SCHEMA_VERSION = 2
+PROFILE_COLUMNS = ["Invoice", "Description", "Quantity", "Revenue", "Country", "YearMonth", "Cluster"]
+RFM_COLUMNS = ["Recency", "Frequency", "Monetary"]
+TOP_N = 5
+
+
+def _version(profiles):
+    # Id versi = hash isi snapshot; sama selama data tidak berubah
+    body = json.dumps({"global": profiles["global"], "clusters": profiles["clusters"]}, sort_keys=True)
+    return hashlib.sha1(body.encode()).hexdigest()[:12]
+
+
+def _frame(df):
+    df = df[PROFILE_COLUMNS].dropna(subset=["Cluster"])
+    return df.assign(Cluster=df["Cluster"].astype("int64"), Country=df["Country"].astype(str), YearMonth=df["YearMonth"].astype(str))
+
+
+def _aggregates(df):
+    # Agregat aditif per cluster (dijumlah antar batch). Invoice milik satu customer -> satu cluster,
+    # sehingga avg basket = revenue / jumlah invoice.
+    return {
+        "revenue": df.groupby("Cluster")["Revenue"].sum(),
+        "invoices": df.groupby("Cluster")["Invoice"].nunique(),
+        "countries": df.groupby(["Cluster", "Country"], observed=True).size(),
+        "trend": df.groupby(["Cluster", "YearMonth"], observed=True)["Revenue"].sum(),
+    }
+
+
+def _by_cluster(values, level):
+    keys = list(values)
+    index = pd.MultiIndex.from_arrays([[c for c, _ in keys], [k for _, k in keys]], names=["Cluster", level])
+    return pd.Series(list(values.values()), index=index, dtype=float)
+
+
+def _stored_aggregates(profiles):
+    # Agregat aditif dari snapshot yang sudah ada
+    revenue, invoices, countries, trend = {}, {}, {}, {}
+    for c, p in profiles["clusters"].items():
+        if not p["invoices"]: continue
+        c = int(c)
+        revenue[c], invoices[c] = p["revenue"], p["invoices"]
+        countries.update({(c, k): v for k, v in p["countries"].items()})
+        trend.update({(c, m): v for m, v in p["trend"]})
+    return {
+        "revenue": pd.Series(revenue, dtype=float).rename_axis("Cluster"),
+        "invoices": pd.Series(invoices, dtype="int64").rename_axis("Cluster"),
+        "countries": _by_cluster(countries, "Country"),
+        "trend": _by_cluster(trend, "YearMonth"),
+    }
+
+
+def _xs(series, c):
+    return series.xs(c, level="Cluster") if c in series.index.get_level_values("Cluster") else pd.Series(dtype=float)
+
+
+def _profiles(agg, products, rfm, rows, top_n=TOP_N):
+    revenue, invoices, countries, trend = agg["revenue"], agg["invoices"], agg["countries"], agg["trend"]
+    rfm = rfm.dropna(subset=["Cluster"]).astype({"Cluster": "int64"})
+    # Negara dengan baris terbanyak; seri diputus alfabetis seperti Series.mode()
+    country = countries.rename("n").reset_index()
+    top_country = country.sort_values(["Cluster", "n", "Country"], ascending=[True, False, True]).groupby("Cluster")["Country"].first()
+    population = rfm.groupby("Cluster").size()
+    rfm_mean = rfm.groupby("Cluster")[RFM_COLUMNS].mean()
+
+    clusters = {}
+    for c in sorted(set(revenue.index) | set(population.index)):
+        n_inv = int(invoices.get(c, 0))
+        c_top = _xs(products, c).sort_values(ascending=False).head(top_n)
+        c_rfm = rfm_mean.loc[c] if c in rfm_mean.index else pd.Series(float("nan"), index=RFM_COLUMNS)
+        clusters[str(c)] = {
+            "population": int(population.get(c, 0)),
+            "revenue": float(revenue.get(c, 0.0)),
+            "avg_basket": float(revenue.get(c, 0.0) / n_inv) if n_inv else float("nan"),
+            "top_country": top_country.get(c, "-"),
+            "rfm_mean": {k: float(c_rfm[k]) for k in RFM_COLUMNS},
+            "trend": [[str(m), float(v)] for m, v in _xs(trend, c).sort_index().items()],
+            "top_products": [[str(d), int(q)] for d, q in c_top.items()],
+            "invoices": n_inv,
+            "countries": {str(k): int(v) for k, v in _xs(countries, c).items()},
+        }
+
+    profiles = {
+        "schema": SCHEMA_VERSION,
+        "built_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "rows": int(rows),
+        "global": {"rfm_mean": {k: float(rfm[k].mean()) for k in RFM_COLUMNS}},
+        "clusters": clusters,
+    }
+    profiles["version"] = _version(profiles)
+    return profiles
+
+
+def build_cluster_profiles(df_full, rfm, top_n=TOP_N):
+    # Satu pass groupby per metrik untuk semua cluster sekaligus
+    df = _frame(df_full)
+    products = df.groupby(["Cluster", "Description"], observed=True)["Quantity"].sum()
+    return _profiles(_aggregates(df), products, rfm, len(df), top_n)
+
+
+def update_cluster_profiles(profiles, batch, rfm, cluster_item_counts, top_n=TOP_N):
+    # Snapshot lama + agregat batch baru (baris sudah ber-Cluster terkini, None = tanpa transaksi baru);
+    # populasi & rata-rata RFM dari rfm. Top produk dari cluster_item_counts state incremental
+    # (histori customer yang pindah cluster ikut pindah, sama seperti topN_cluster).
+    agg, rows = _stored_aggregates(profiles), profiles["rows"]
+    if batch is not None and len(batch):
+        df = _frame(batch)
+        agg = {k: v.add(_aggregates(df)[k], fill_value=0) for k, v in agg.items()}
+        rows += len(df)
+    agg["invoices"] = agg["invoices"].astype("int64")
+    agg["countries"] = agg["countries"].astype("int64")
+    return _profiles(agg, cluster_item_counts, rfm, rows, top_n)
+
+
+def cluster_ids(profiles):
+    return sorted(int(c) for c in profiles["clusters"])
+
+
+def get_profile(profiles, cluster):
+    return profiles["clusters"].get(str(int(cluster)))
+
+
+def profile_trend(profile):
+    return pd.Series({m: v for m, v in profile["trend"]}, name="Revenue", dtype=float).rename_axis("YearMonth")
+
+
+def profile_top_products(profile):
+    return pd.DataFrame(profile["top_products"], columns=["Description", "Quantity"])
+
+
+def save_cluster_profiles(profiles, path=PROFILES_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f: json.dump(profiles, f)
+    os.replace(tmp, path)
+
+
+def load_cluster_profiles(path=PROFILES_FILE):
+    # None bila file ditulis dengan schema lama -> caller membangun ulang dari df_full
+    with open(path) as f: profiles = json.load(f)
+    return profiles if profiles.get("schema") == SCHEMA_VERSION else None
+
+
+def cluster_profiles_available(path=PROFILES_FILE):
+    return os.path.isfile(path)
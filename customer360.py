@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+
+from customer_index import normalize_customer_id
+from perf import count_cache, timed
+from product_stats import best_sellers
+from recommender import health_status, recommend_products
+
+# --- Customer 360 Result Cache ---
+# Hasil Customer 360 yang sudah dirakit (rekomendasi, RFM, status kesehatan, data kartu produk)
+# disimpan di LRU berukuran tetap, key = (versi artefak, Customer ID, n, tanggal acuan).
+# Statistik global (max Recency, p95 Frequency/Monetary, top customer per cluster) dihitung
+# sekali per versi artefak di ArtifactStore. Pre-warm opsional: top customer tiap cluster.
+
+CACHE_SIZE = int(os.environ.get("ASAH_C360_CACHE_SIZE", 1024))
+PREWARM_PER_CLUSTER = int(os.environ.get("ASAH_C360_PREWARM", 0))
+CARD_LISTS = ["Top Cluster Products", "Similar Products (CF)", "Cluster Products Not Bought"]
+
+
+def rfm_stats(rfm):
+    # Skala progress bar RFM (sama untuk semua customer dalam satu versi data)
+    if rfm.empty: return {"max_recency": 0.0, "p95_frequency": 0.0, "p95_monetary": 0.0}
+    return {
+        "max_recency": float(rfm["Recency"].max()),
+        "p95_frequency": float(rfm["Frequency"].quantile(0.95)),
+        "p95_monetary": float(rfm["Monetary"].quantile(0.95)),
+    }
+
+
+def top_customers(rfm, per_cluster=3):
+    # Top customer per cluster berdasarkan Monetary (cheat sheet & pre-warm)
+    if rfm.empty: return rfm
+    top = rfm.sort_values("Monetary", ascending=False).groupby("Cluster", sort=True).head(per_cluster)
+    return top.sort_values(["Cluster", "Monetary"], ascending=[True, False])[["Customer ID", "Cluster", "Monetary"]]
+
+
+def product_cards(p_list, catalog, n=5):
+    # Baris kartu produk (Description, UnitPrice, Quantity); list kosong -> best seller global
+    fallback = not p_list
+    if fallback: p_list = best_sellers(catalog, n)
+    cards = catalog[["UnitPrice", "Quantity"]].reindex(p_list).rename_axis("Description").reset_index()
+    return {"cards": cards[cards["UnitPrice"].notna()].reset_index(drop=True), "fallback": fallback}
+
+
+def assemble(store, customer_id, n=5, as_of=None):
+    # Satu respons Customer 360 lengkap dari satu snapshot store; (hasil, pesan error)
+    topN, u_matrix, i_nbrs = store.models
+    cust_idx = store.customer_index
+    if u_matrix is None or cust_idx is None: return None, "Data model / RFM belum tersedia (lihat diagnostik artefak)."
+    res, err = recommend_products(customer_id, cust_idx, topN, u_matrix, i_nbrs, n=n)
+    if err: return None, err
+
+    cid = normalize_customer_id(customer_id)
+    prof = cust_idx.profile(cid)
+    rfm = {k: float(prof[k]) for k in ["Recency", "Frequency", "Monetary"]}
+    as_of_missing = False
+    if as_of is not None and store.rfm_history is not None:
+        # RFM & status kesehatan per tanggal acuan (binary search di index as-of)
+        live = store.rfm_history.customer(cid, as_of)
+        if live is not None: rfm = {k: float(live[k]) for k in rfm}
+        else: as_of_missing = True
+    status, color = health_status(rfm["Recency"])
+    catalog = store.catalog
+    return {
+        "Customer ID": cid,
+        "Cluster": res["Cluster"],
+        "RFM": rfm,
+        "Health": (status, color),
+        "As Of Missing": as_of_missing,
+        "Recommendations": res,
+        "Cards": {col: product_cards(res[col], catalog, n) for col in CARD_LISTS},
+    }, None
+
+
+class Customer360Cache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, store, customer_id, n=5, as_of=None):
+        # Hasil (termasuk error "tidak ditemukan") di-cache per versi artefak; input yang bukan ID
+        # tidak di-cache (semua ter-normalisasi ke None, pesan error memuat input aslinya)
+        cid = normalize_customer_id(customer_id)
+        if cid is None: return assemble(store, customer_id, n, as_of)
+        key = (store.version or os.path.abspath(store.base_dir), cid, n, as_of)
+        with self._lock:
+            hit = key in self._items
+            if hit:
+                self._items.move_to_end(key)
+                self.hits += 1
+                value = self._items[key]
+            else: self.misses += 1
+        count_cache("customer360", hit)
+        if hit: return value
+
+        with timed("customer360.assemble"): value = assemble(store, customer_id, n, as_of)
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize: self._items.popitem(last=False)
+        return value
+
+    def prewarm(self, store, per_cluster=3, n=5):
+        # Isi cache untuk top customer tiap cluster (dipanggil di thread background)
+        with timed("customer360.prewarm"):
+            ids = store.top_customers(per_cluster)["Customer ID"].tolist() if not store.rfm.empty else []
+            for cid in ids: self.get(store, cid, n)
+        return len(ids)
+
+    def clear(self):
+        with self._lock: self._items.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._items), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
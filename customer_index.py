@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# --- Customer Lookup Index ---
+# Customer ID dinormalisasi sekali ke int64, lalu dipetakan ke posisi baris lewat
+# array dense (id - min_id -> posisi). Lookup cluster / RFM / baris user_item_matrix
+# jadi O(1), tanpa scan kolom dan tanpa fallback casting ke str.
+
+MAX_DENSE_SPAN = 50_000_000  # di atas ini pakai searchsorted (O(log n)) agar array tidak kebesaran
+ID_MIN, ID_MAX = -(1 << 63), (1 << 63) - 1  # rentang int64 (di luar ini = ID tidak valid)
+
+
+def normalize_customer_ids(values):
+    ids = pd.to_numeric(pd.Series(values), errors="coerce")
+    return ids.astype("Int64")
+
+
+def normalize_customer_id(cid):
+    try: cid = int(cid)
+    except OverflowError: return None  # inf (mis. JSON 1e999)
+    except (TypeError, ValueError):
+        try: cid = int(float(cid))
+        except (TypeError, ValueError, OverflowError): return None
+    return cid if ID_MIN <= cid <= ID_MAX else None
+
+
+class IdIndex:
+    def __init__(self, ids):
+        ids = normalize_customer_ids(ids)
+        valid = ids.notna().to_numpy()
+        self.ids = ids[valid].to_numpy(dtype=np.int64)
+        positions = np.flatnonzero(valid).astype(np.int32)
+        self.min_id = int(self.ids.min()) if len(self.ids) else 0
+        span = int(self.ids.max()) - self.min_id + 1 if len(self.ids) else 0
+
+        if span <= MAX_DENSE_SPAN:
+            self.table = np.full(span, -1, dtype=np.int32)
+            self.table[self.ids - self.min_id] = positions
+            self.sorted_ids = self.sorted_pos = None
+        else:
+            order = np.argsort(self.ids, kind="stable")
+            self.table = None
+            self.sorted_ids, self.sorted_pos = self.ids[order], positions[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, cid):
+        return self.get(cid) >= 0
+
+    def get(self, cid):
+        cid = normalize_customer_id(cid)
+        if cid is None: return -1
+        return int(self.get_many(np.array([cid], dtype=np.int64))[0])
+
+    def get_many(self, cids):
+        # Vectorized: array customer id -> array posisi (-1 jika tidak ada)
+        cids = np.asarray(cids, dtype=np.int64)
+        out = np.full(cids.shape, -1, dtype=np.int32)
+        if self.table is not None:
+            rel = cids - self.min_id
+            ok = (rel >= 0) & (rel < len(self.table))
+            out[ok] = self.table[rel[ok]]
+        elif len(self.sorted_ids):
+            pos = np.clip(np.searchsorted(self.sorted_ids, cids), 0, len(self.sorted_ids) - 1)
+            hit = self.sorted_ids[pos] == cids
+            out[hit] = self.sorted_pos[pos[hit]]
+        return out
+
+
+class CustomerIndex:
+    def __init__(self, rfm, matrix_ids=None):
+        self.rows = IdIndex(rfm["Customer ID"])
+        self.cluster = rfm["Cluster"].to_numpy(dtype=np.int16)
+        self.recency = rfm["Recency"].to_numpy(dtype=np.float64)
+        self.frequency = rfm["Frequency"].to_numpy(dtype=np.float64)
+        self.monetary = rfm["Monetary"].to_numpy(dtype=np.float64)
+        self.matrix = IdIndex(matrix_ids) if matrix_ids is not None else None
+
+    def __contains__(self, cid):
+        return cid in self.rows
+
+    def rfm_row(self, cid):
+        return self.rows.get(cid)
+
+    def matrix_row(self, cid):
+        return self.matrix.get(cid) if self.matrix is not None else -1
+
+    def profile(self, cid):
+        r = self.rows.get(cid)
+        if r < 0: return None
+        return {
+            "Customer ID": normalize_customer_id(cid),
+            "Cluster": int(self.cluster[r]),
+            "Recency": self.recency[r],
+            "Frequency": self.frequency[r],
+            "Monetary": self.monetary[r],
+        }
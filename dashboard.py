@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
-import pickle
 import matplotlib.pyplot as plt
 import gc 
+import os
+import threading
+import perf
+from storage import head_transactions, storage_available
+from export import DASHBOARD_MAX_ROWS, FORMATS, export_filtered
+from customer360 import PREWARM_PER_CLUSTER, Customer360Cache
+from cluster_profiles import RFM_COLUMNS, cluster_ids, get_profile, profile_top_products, profile_trend
+from rfm_history import segment_mix
+from store import LiveStore
 
 # --- Page Config ---
 st.set_page_config(page_title="Retail Analytics Dashboard", layout="wide", page_icon="🛍️")
@@ -44,87 +52,56 @@ CLUSTER_PROFILE = {
 }
 
 # --- Load Data ---
-@st.cache_data
-def load_basic_data():
-    try:
-        df_full = pd.read_csv("df_full.csv")
-        rfm = pd.read_pickle("rfm.pkl")
-        return df_full, rfm
-    except: return pd.DataFrame(), pd.DataFrame()
-
-@st.cache_data
-def load_recommendation_models():
-    try:
-        user_item_matrix = pd.read_pickle("user_item_matrix.pkl")
-        item_similarity_df = pd.read_pickle("item_similarity_df.pkl")
-        with open("topN_cluster.pkl", "rb") as f:
-            topN_cluster = pickle.load(f)
+@st.cache_resource
+def get_live_store():
+    # Satu store per proses: artefak dimuat sekali & dibagi (tanpa copy) ke semua session.
+    # Versi baru di registry dimuat di background lalu ditukar tanpa restart worker.
+    return LiveStore(poll_s=float(os.environ.get("ASAH_RELOAD_SECONDS", 30))).start()
+
+@st.cache_resource
+def get_c360_cache():
+    # LRU hasil Customer 360 per proses; ASAH_C360_PREWARM=N mengisi top N customer tiap cluster
+    cache = Customer360Cache()
+    if PREWARM_PER_CLUSTER:
+        live = get_live_store()
+        warm = lambda s: cache.prewarm(s, PREWARM_PER_CLUSTER)
+        threading.Thread(target=warm, args=(live.snapshot(),), daemon=True, name="c360-prewarm").start()
+        live.on_swap(warm)
+    return cache
+
+@st.cache_resource
+def start_metrics_server():
+    # Endpoint Prometheus lokal, opt-in lewat ASAH_METRICS_PORT
+    port = os.environ.get("ASAH_METRICS_PORT")
+    return perf.start_metrics_server(int(port)) if port else None
+
+@perf.timed_fn("filter")
+def get_sample_data(countries, months, clusters, n=5):
+    # Sampel tabel: filter didorong ke storage & berhenti membaca setelah n baris
+    if storage_available(store.data_dir): return head_transactions(store.data_dir, n, countries, months, clusters)
+    df_full = store.transactions
+    if df_full.empty: return df_full
+    mask = pd.Series(True, index=df_full.index)
+    if countries: mask &= df_full["Country"].isin(countries)
+    if months: mask &= df_full["YearMonth"].isin(months)
+    if clusters: mask &= df_full["Cluster"].isin(clusters)
+    return df_full[mask].head(n)
+
+def export_download(fmt, countries, months, clusters):
+    # Dipanggil Streamlit hanya saat tombol download diklik; file ditulis per batch lalu dihapus.
+    # Streamlit menahan hasilnya di memori -> dibatasi DASHBOARD_MAX_ROWS baris
+    with perf.timed("export"):
+        df = None if storage_available(store.data_dir) else store.transactions
+        path = export_filtered(fmt, countries, months, clusters, df=df, path=store.data_dir, max_rows=DASHBOARD_MAX_ROWS)
         try:
-            user_item_matrix.index = pd.to_numeric(user_item_matrix.index, errors="coerce").astype('Int64')
-        except: pass
-        return topN_cluster, user_item_matrix, item_similarity_df
-    except: return None, None, None
+            with open(path, "rb") as f: return f.read()
+        finally: os.remove(path)
 
-df_full, rfm = load_basic_data()
-
-# --- Helper Functions ---
-def try_cast_customerid_to_int(df, col):
-    try: df[col] = pd.to_numeric(df[col], errors="coerce").astype('Int64')
-    except: pass
-    return df
-
-try:
-    if not rfm.empty: rfm = try_cast_customerid_to_int(rfm, "Customer ID")
-    if not df_full.empty: df_full = try_cast_customerid_to_int(df_full, "Customer ID")
-except: pass
-
-def normalize_customer_id_input(cid_input):
-    try: return int(cid_input)
-    except: return cid_input
-
-def recommend_products(customer_id, rfm_df, top_cluster_df, user_matrix, item_sim_df, n=5):
-    cid = normalize_customer_id_input(customer_id)
-    try: in_rfm = cid in rfm_df['Customer ID'].astype(object).values
-    except: in_rfm = cid in rfm_df['Customer ID'].values
-
-    if not in_rfm: return None, f"ID {customer_id} tidak ditemukan."
-
-    try: in_user_matrix = cid in user_matrix.index.astype(object)
-    except: in_user_matrix = cid in user_matrix.index
-
-    if not in_user_matrix: return None, f"ID {customer_id} tidak memiliki transaksi."
-
-    try: cluster = int(rfm_df.loc[rfm_df['Customer ID'] == cid, 'Cluster'].values[0])
-    except: cluster = int(rfm_df.loc[rfm_df['Customer ID'].astype(str) == str(cid), 'Cluster'].values[0])
-
-    cluster_reco = top_cluster_df[top_cluster_df['Cluster'] == cluster]['Description'].tolist()[:n]
-    
-    bought_items = []
-    try:
-        bought_series = user_matrix.loc[cid]
-        bought_items = bought_series[bought_series > 0].index.tolist()
-    except:
-        try:
-            bought_series = user_matrix.loc[str(cid)]
-            bought_items = bought_series[bought_series > 0].index.tolist()
-        except: bought_items = []
-
-    similar_items = []
-    if len(bought_items) > 0:
-        last_item = bought_items[-1]
-        if last_item in item_sim_df.columns:
-            sim = item_sim_df[last_item].sort_values(ascending=False).head(n+1).index.tolist()
-            similar_items = [i for i in sim if i != last_item][:n]
-    
-    not_bought = [i for i in cluster_reco if i not in bought_items][:n]
-
-    return {
-        "Cluster": int(cluster),
-        "Top Cluster Products": cluster_reco,
-        "Similar Products (CF)": similar_items,
-        "Cluster Products Not Bought": not_bought,
-        "Bought List": bought_items
-    }, None
+run_start = perf.mark()
+# Satu snapshot versi artefak untuk seluruh rerun ini
+live_store = get_live_store()
+store = live_store.snapshot()
+start_metrics_server()
 
 # --- Sidebar ---
 st.sidebar.image("https://assets.cdn.dicoding.com/original/commons/logo-asah.png", use_container_width=True)
@@ -133,21 +110,23 @@ with l1: st.image("https://assets.cdn.dicoding.com/original/commons/certificate_
 with l2: st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/cd/Accenture.svg/250px-Accenture.svg.png", use_container_width=True)
 
 st.sidebar.header("Global Filters")
-if not df_full.empty:
-    all_countries = sorted(df_full["Country"].dropna().unique())
-    all_months = sorted(df_full["YearMonth"].dropna().unique())
-    all_clusters = sorted(df_full["Cluster"].dropna().unique())
-
-    country_filter = st.sidebar.multiselect("🌍 Filter Country", options=all_countries)
-    month_filter = st.sidebar.multiselect("📅 Filter Bulan", options=all_months)
-    cluster_filter = st.sidebar.multiselect("📦 Filter Cluster", options=all_clusters)
-
-    df_filtered = df_full.copy()
-    if country_filter: df_filtered = df_filtered[df_filtered["Country"].isin(country_filter)]
-    if month_filter: df_filtered = df_filtered[df_filtered["YearMonth"].isin(month_filter)]
-    if cluster_filter: df_filtered = df_filtered[df_filtered["Cluster"].isin(cluster_filter)]
+# Opsi filter diambil dari cube rollup (kecil), bukan dari df_full
+cube = store.rollup
+if cube is not None:
+    country_filter = st.sidebar.multiselect("🌍 Filter Country", options=cube.countries)
+    month_filter = st.sidebar.multiselect("📅 Filter Bulan", options=cube.months)
+    cluster_filter = st.sidebar.multiselect("📦 Filter Cluster", options=cube.clusters)
 else:
-    df_filtered = pd.DataFrame()
+    country_filter, month_filter, cluster_filter = [], [], []
+
+# Tanggal acuan RFM: default invoice terakhir (sama dengan rfm.pkl), hanya bisa mundur dalam rentang data
+history = store.rfm_history
+as_of_ref = None
+if history is not None:
+    last_day = (history.reference_date - pd.Timedelta(days=1)).date()
+    as_of = st.sidebar.date_input("📆 Tanggal Acuan RFM", value=last_day, min_value=history.first_date.date(),
+                                  max_value=last_day)
+    if as_of != last_day: as_of_ref = pd.Timestamp(as_of) + pd.Timedelta(days=1)
 
 menu = st.sidebar.radio("Navigasi:", ["Dashboard EDA", "Customer Recommendation", "Cluster Insight"])
 
@@ -156,13 +135,17 @@ if menu == "Dashboard EDA":
     st.title("📈 Executive Dashboard Overview")
     st.markdown("Ringkasan performa bisnis makro berdasarkan parameter filter yang dipilih.")
     
-    if df_filtered.empty:
+    rfm = store.rfm
+    with perf.timed("eda.summarize"):
+        summary = cube.summarize(country_filter, month_filter, cluster_filter) if cube is not None else None
+
+    if summary is None or summary["total_trx"] == 0:
         st.warning("Data kosong.")
     else:
-        total_rev = df_filtered['Revenue'].sum()
-        total_trx = df_filtered.shape[0]
-        active_cust = df_filtered['Customer ID'].nunique()
-        unique_prod = df_filtered['Description'].nunique()
+        total_rev = summary["total_rev"]
+        total_trx = summary["total_trx"]
+        active_cust = summary["active_cust"]
+        unique_prod = summary["unique_prod"]
         avg_sales = total_rev / total_trx if total_trx > 0 else 0
 
         k1, k2, k3, k4, k5 = st.columns(5)
@@ -173,19 +156,20 @@ if menu == "Dashboard EDA":
         with k5: st.metric("Avg. Sales / Trx", f"£{avg_sales:,.2f}", help="Rata-rata nilai keranjang belanja.")
 
         with st.expander("📂 Klik untuk melihat Sampel Data Transaksi"):
-            st.dataframe(df_filtered.head(), use_container_width=True)
+            st.dataframe(get_sample_data(country_filter, month_filter, cluster_filter), use_container_width=True)
 
+        charts_start = perf.mark()
         st.markdown("---")
         c1, c2 = st.columns([2, 1])
         with c1:
             st.subheader("📅 Revenue Trend Analysis")
-            rev_trend = df_filtered.groupby("YearMonth")["Revenue"].sum()
+            rev_trend = summary["rev_trend"]
             if not rev_trend.empty: st.line_chart(rev_trend, color="#29b5e8")
             else: st.warning("Data tren tidak tersedia.")
 
         with c2:
             st.subheader("👥 Cluster Distribution")
-            c_dist = df_filtered.groupby("Customer ID")["Cluster"].first().value_counts().sort_index()
+            c_dist = summary["cluster_dist"].copy()
             c_dist.index = [f"{i}: {CLUSTER_PROFILE[i]['name'].split('(')[0]}" for i in c_dist.index]
             if not c_dist.empty: st.bar_chart(c_dist, color="#ffaa00")
 
@@ -193,12 +177,12 @@ if menu == "Dashboard EDA":
         c3, c4 = st.columns(2)
         with c3:
             st.subheader("🏆 Top 10 Best Sellers (Volume)")
-            top_prod = df_filtered.groupby("Description")["Quantity"].sum().sort_values(ascending=False).head(10)
+            top_prod = summary["top_products"]
             st.bar_chart(top_prod, horizontal=True)
 
         with c4:
             st.subheader("📍 Customer Value Map (RFM Segments)")
-            active_c = df_filtered["Customer ID"].unique()
+            active_c = summary["active_customers"]
             rfm_f = rfm[rfm["Customer ID"].isin(active_c)].copy()
             if not rfm_f.empty:
                 rfm_f["Cluster Group"] = rfm_f["Cluster"].map(lambda x: CLUSTER_PROFILE.get(x, {}).get('name', str(x)))
@@ -206,15 +190,52 @@ if menu == "Dashboard EDA":
 
         st.markdown("---")
         st.subheader("💎 Top 10 High Value Customers (Champions)")
-        top_c = df_filtered.groupby("Customer ID")["Revenue"].sum().sort_values(ascending=False).head(10).reset_index()
+        top_c = summary["top_customers"].reset_index()
         top_c = top_c.merge(rfm[['Customer ID', 'Cluster']], on='Customer ID', how='left')
         top_c['Cluster Group'] = top_c['Cluster'].map(lambda x: CLUSTER_PROFILE.get(x, {}).get('name', str(x)))
         top_c["Revenue"] = top_c["Revenue"].apply(lambda x: f"£{x:,.0f}")
         top_c['Customer ID'] = top_c['Customer ID'].astype(str)
         st.dataframe(top_c[['Customer ID', 'Cluster Group', 'Revenue']], use_container_width=True, hide_index=True)
-
-        csv = df_filtered.to_csv(index=False).encode('utf-8')
-        st.download_button("Download Filtered Data (CSV)", csv, "filtered_retail_data.csv", "text/csv")
+        perf.since("eda.charts", charts_start)
+
+        e1, e2 = st.columns([1, 3])
+        with e1: exp_fmt = st.selectbox("Format Export", list(FORMATS), index=1, label_visibility="collapsed")
+        with e2:
+            ext, mime, _ = FORMATS[exp_fmt]
+            st.download_button(f"Download Filtered Data ({exp_fmt.upper()})",
+                               lambda: export_download(exp_fmt, country_filter, month_filter, cluster_filter),
+                               f"filtered_retail_data{ext}", mime)
+            if summary is not None and summary["total_trx"] > DASHBOARD_MAX_ROWS:
+                st.caption(f"Download dibatasi {DASHBOARD_MAX_ROWS:,} baris pertama dari {summary['total_trx']:,}. "
+                           "Export lengkap: `python export.py --out <file>` dengan filter yang sama.")
+
+    # RFM & komposisi segmen per tanggal acuan (index as-of, tanpa groupby transaksi)
+    if history is not None:
+        st.markdown("---")
+        ref = as_of_ref if as_of_ref is not None else history.reference_date
+        st.subheader(f"🕰️ RFM & Segment Mix per {(ref - pd.Timedelta(days=1)):%d %b %Y}")
+        windows = {"Semua histori": None, "30 hari terakhir": 30, "90 hari terakhir": 90, "180 hari terakhir": 180, "365 hari terakhir": 365}
+        win = st.selectbox("Jendela Waktu", list(windows))
+        with perf.timed("rfm_asof"):
+            start = ref - pd.Timedelta(days=windows[win]) if windows[win] else None
+            rfm_asof = history.rfm(ref, start)
+            model = store.cluster_model
+            if model is not None and not rfm_asof.empty: rfm_asof = segment_mix(rfm_asof, model)
+
+        if rfm_asof.empty: st.info("Tidak ada customer aktif pada jendela ini.")
+        else:
+            a1, a2, a3, a4 = st.columns(4)
+            with a1: st.metric("Customer Aktif", f"{len(rfm_asof):,}")
+            with a2: st.metric("Rata-rata Recency", f"{rfm_asof['Recency'].mean():.1f} Hari")
+            with a3: st.metric("Rata-rata Frequency", f"{rfm_asof['Frequency'].mean():.1f}x")
+            with a4: st.metric("Rata-rata Monetary", f"£{rfm_asof['Monetary'].mean():,.0f}")
+            if "Cluster" in rfm_asof.columns:
+                mix = rfm_asof.groupby("Cluster")[["Recency", "Frequency", "Monetary"]].mean()
+                mix.insert(0, "Customers", rfm_asof["Cluster"].value_counts().sort_index())
+                mix.index = [f"{i}: {CLUSTER_PROFILE.get(i, {}).get('name', str(i))}" for i in mix.index]
+                m1, m2 = st.columns([1, 2])
+                with m1: st.bar_chart(mix["Customers"], color="#ffaa00")
+                with m2: st.dataframe(mix.round(1), use_container_width=True)
 
 # --- 2. Customer Recommendation ---
 elif menu == "Customer Recommendation":
@@ -223,10 +244,11 @@ elif menu == "Customer Recommendation":
 
     with st.expander("💡 Cheat Sheet: Contoh ID Customer per Cluster (Untuk Demo)"):
         cols_cheat = st.columns(4)
-        for i, cls_id in enumerate(sorted(rfm['Cluster'].unique())):
+        # Top 3 per cluster dihitung sekali per versi artefak
+        top_by_cluster = store.top_customers(3)
+        for i, (cls_id, top3) in enumerate(top_by_cluster.groupby("Cluster") if not top_by_cluster.empty else []):
             with cols_cheat[i]:
                 st.markdown(f"**{CLUSTER_PROFILE[cls_id]['name'].split('(')[0]}**")
-                top3 = rfm[rfm['Cluster'] == cls_id].sort_values('Monetary', ascending=False).head(3)
                 for _, r in top3.iterrows():
                     st.code(f"{int(r['Customer ID'])}")
                     st.caption(f"Rev: £{r['Monetary']:,.0f}")
@@ -237,24 +259,15 @@ elif menu == "Customer Recommendation":
         st.write("##") 
         check_btn = st.button("🔍 Generate Strategy", type="primary")
 
-    def display_product_cards(p_list, df_src, label=None):
-        if not p_list:
-            p_list = df_src.groupby("Description")["Quantity"].sum().sort_values(ascending=False).head(5).index.tolist()
-            label = "🔥 Global Best Seller"
-        
-        subset = df_src[df_src['Description'].isin(p_list)].copy()
-        if subset.empty: return
-
-        if 'UnitPrice' not in subset.columns:
-            subset = subset[subset['Quantity'] > 0]
-            subset['UnitPrice'] = subset['Revenue'] / subset['Quantity']
-
-        stats = subset.groupby('Description').agg({'UnitPrice': 'mean', 'Quantity': 'sum'}).reset_index()
-        stats = stats.set_index('Description').reindex(p_list).reset_index()
+    @perf.timed_fn("product_cards")
+    def display_product_cards(cards, label=None):
+        # cards: hasil customer360.product_cards (sudah di-lookup & di-cache)
+        if cards["fallback"]: label = "🔥 Global Best Seller"
+        stats = cards["cards"]
+        if stats.empty: return
         cols = st.columns(2)
         
         for idx, row in stats.iterrows():
-            if pd.isna(row['UnitPrice']): continue
             with cols[idx % 2]:
                 with st.container(border=True):
                     if label: st.markdown(f":red-background[**{label}**]")
@@ -266,23 +279,21 @@ elif menu == "Customer Recommendation":
                         st.caption(f"Total Terjual: {int(row['Quantity']):,} unit")
 
     if check_btn:
+        # Hasil rakitan (rekomendasi, RFM as-of, kartu produk) dari LRU per versi artefak
         with st.spinner("Menganalisis profil, menghitung skor RFM, & mencari produk relevan..."):
-            topN, u_matrix, i_sim = load_recommendation_models()
-        
-        res, err = recommend_products(cid_input, rfm, topN, u_matrix, i_sim)
+            with perf.timed("recommend_products"):
+                c360, err = get_c360_cache().get(store, cid_input, 5, as_of_ref)
 
         if err: st.error(err)
         else:
-            cid = normalize_customer_id_input(cid_input)
-            cluster = res["Cluster"]
+            cid = c360["Customer ID"]
+            cluster = c360["Cluster"]
             c_prof = CLUSTER_PROFILE.get(cluster, {})
             
-            rec_df = rfm.loc[rfm["Customer ID"] == cid]
-            my_rec, my_freq, my_mon = rec_df["Recency"].values[0], rec_df["Frequency"].values[0], rec_df["Monetary"].values[0]
+            my_rec, my_freq, my_mon = c360["RFM"]["Recency"], c360["RFM"]["Frequency"], c360["RFM"]["Monetary"]
+            if c360["As Of Missing"]: st.info("Belum ada transaksi sebelum tanggal acuan; RFM ditampilkan per data terakhir.")
 
-            if my_rec <= 30: status, color = "Active 🟢", "green"
-            elif my_rec <= 90: status, color = "Warning 🟡", "orange"
-            else: status, color = "Churn Risk 🔴", "red"
+            status, color = c360["Health"]
 
             st.markdown("---")
             # Profile Header
@@ -293,8 +304,9 @@ elif menu == "Customer Recommendation":
                     st.markdown(f"### {c_prof['name']}")
                     st.caption(f"ID: {cid} | Status Kesehatan: :{color}[{status}]")
                 with c2:
-                    max_r, max_f, max_m = rfm['Recency'].max(), rfm['Frequency'].quantile(0.95), rfm['Monetary'].quantile(0.95)
-                    def prog(v, m): return min((v/m), 1.0)
+                    g_stats = store.rfm_stats_at(None if c360["As Of Missing"] else as_of_ref)
+                    max_r, max_f, max_m = g_stats["max_recency"], g_stats["p95_frequency"], g_stats["p95_monetary"]
+                    def prog(v, m): return max(0.0, min(v / m, 1.0)) if m > 0 else 0.0
                     m1, m2, m3 = st.columns(3)
                     with m1:
                         st.metric("Recency (Hari Terakhir)", f"{int(my_rec)} Hari")
@@ -356,13 +368,13 @@ elif menu == "Customer Recommendation":
             t1, t2, t3 = st.tabs(["🔥 Top Segment Picks", "🤝 Personal Match (AI)", "🆕 Upsell Opportunities"])
             with t1: 
                 st.caption(f"Produk paling populer yang dibeli oleh segmen **{c_prof['name']}**.")
-                display_product_cards(res["Top Cluster Products"], df_full, promo_txt)
+                display_product_cards(c360["Cards"]["Top Cluster Products"], promo_txt)
             with t2: 
-                st.caption("Rekomendasi personal berdasarkan pola kemiripan belanja (Collaborative Filtering).")
-                display_product_cards(res["Similar Products (CF)"], df_full, "❤️ FOR YOU")
+                st.caption("Rekomendasi personal berdasarkan kemiripan dengan seluruh riwayat belanja customer (Collaborative Filtering).")
+                display_product_cards(c360["Cards"]["Similar Products (CF)"], "❤️ FOR YOU")
             with t3: 
                 st.caption("Produk populer di segmen ini yang **belum pernah** dibeli customer (Peluang Cross-sell).")
-                display_product_cards(res["Cluster Products Not Bought"], df_full, "🆕 TRY THIS")
+                display_product_cards(c360["Cards"]["Cluster Products Not Bought"], "🆕 TRY THIS")
             
             # --- DESCRIPTIVE IMPACT ANALYSIS ---
             st.markdown("---")
@@ -402,18 +414,25 @@ elif menu == "Cluster Insight":
     st.header("🔎 Cluster Intelligence & Persona Deep Dive")
     st.caption("Memahami DNA perilaku, demografi, dan preferensi produk setiap segmen pelanggan.")
 
+    # Snapshot per cluster (cluster_profiles.json), dihitung saat artefak dibangun
+    profiles = store.cluster_profiles
+    if profiles is None:
+        st.warning("Data cluster tidak tersedia.")
+        st.stop()
+
     # Selectbox di atas
-    c_opts = sorted(df_full["Cluster"].unique())
+    c_opts = cluster_ids(profiles)
     sel_c = st.selectbox("🎯 Pilih Segmen untuk Dianalisis:", c_opts, format_func=lambda x: f"{x} - {CLUSTER_PROFILE[x]['name']}")
+    st.caption(f"Snapshot `{profiles['version']}` · dibangun {profiles['built_at']}")
     
-    # Filter Data
-    c_df = df_full[df_full["Cluster"] == sel_c]
-    c_rfm = rfm[rfm["Cluster"] == sel_c]
-    c_prof = CLUSTER_PROFILE.get(sel_c, {})
-
-    # Data Tambahan untuk Persona
-    top_country = c_df['Country'].mode()[0] if not c_df.empty else "-"
-    avg_basket = c_df.groupby("Invoice")['Revenue'].sum().mean()
+    # Profil cluster terpilih
+    with perf.timed("cluster_insight.compute"):
+        c_stats = get_profile(profiles, sel_c)
+        c_prof = CLUSTER_PROFILE.get(sel_c, {})
+
+        # Data Tambahan untuk Persona
+        top_country = c_stats["top_country"]
+        avg_basket = c_stats["avg_basket"]
     
     # --- PERSONA CARD (EXPANDED) ---
     with st.container(border=True):
@@ -458,14 +477,14 @@ elif menu == "Cluster Insight":
         
         # 4 Key Metrics Bar
         k1, k2, k3, k4 = st.columns(4)
-        with k1: st.metric("👥 Total Populasi", f"{c_rfm.shape[0]:,} User", help="Jumlah user dalam segmen ini")
-        with k2: st.metric("💰 Kontribusi Revenue", f"£{c_df['Revenue'].sum():,.0f}", help="Total uang yang masuk dari segmen ini")
+        with k1: st.metric("👥 Total Populasi", f"{c_stats['population']:,} User", help="Jumlah user dalam segmen ini")
+        with k2: st.metric("💰 Kontribusi Revenue", f"£{c_stats['revenue']:,.0f}", help="Total uang yang masuk dari segmen ini")
         with k3: st.metric("💳 Avg. Basket Size", f"£{avg_basket:,.2f}", help="Rata-rata nilai belanja per sekali transaksi (Invoice)")
         with k4: st.metric("🌍 Domisili Dominan", top_country, help="Negara asal mayoritas user")
 
     # --- Bagian Bawah (Sama seperti sebelumnya) ---
-    g_rec, g_freq, g_mon = rfm["Recency"].mean(), rfm["Frequency"].mean(), rfm["Monetary"].mean()
-    a_rec, a_freq, a_mon = c_rfm["Recency"].mean(), c_rfm["Frequency"].mean(), c_rfm["Monetary"].mean()
+    g_rec, g_freq, g_mon = (profiles["global"]["rfm_mean"][k] for k in RFM_COLUMNS)
+    a_rec, a_freq, a_mon = (c_stats["rfm_mean"][k] for k in RFM_COLUMNS)
 
     st.subheader("📊 Behavioral DNA (vs Global Average)")
     m1, m2, m3 = st.columns(3)
@@ -489,16 +508,18 @@ elif menu == "Cluster Insight":
 
     st.markdown("---")
     st.subheader("📈 Revenue Performance Trend")
-    trend = c_df.groupby("YearMonth")["Revenue"].sum()
+    charts_start = perf.mark()
+    trend = profile_trend(c_stats)
     if not trend.empty: st.area_chart(trend, color="#3b8ed0", height=300)
 
     st.write("##")
     st.subheader("🏆 Product Preference (Top 5 Most Purchased)")
-    top_i = c_df.groupby("Description")["Quantity"].sum().sort_values(ascending=False).head(5).reset_index()
+    top_i = profile_top_products(c_stats)
     for i, r in top_i.iterrows():
         c_p, c_b = st.columns([2, 3])
         with c_p: st.write(f"**{i+1}. {r['Description']}**")
         with c_b: st.progress(r['Quantity'] / top_i['Quantity'].max(), text=f"{int(r['Quantity']):,} unit")
+    perf.since("cluster_insight.charts", charts_start)
 
     st.markdown("---")
     st.subheader("🚀 Strategic Marketing Playbook")
@@ -523,3 +544,27 @@ elif menu == "Cluster Insight":
             elif sel_c == 3: st.write("Membiarkan > 30 hari tanpa kontak (Churn Permanen).")
             elif sel_c == 0: st.write("Menghapus diskon tiba-tiba, min. order terlalu tinggi.")
             else: st.write("Mengabaikan potensi mereka (Silent Growth).")
+
+# --- Performance Diagnostics (opt-in) ---
+perf.since(f"page.{menu}", run_start)
+perf.record_page(menu)
+perf.export()
+if os.environ.get("ASAH_DIAGNOSTICS") == "1" or st.query_params.get("diag") == "1":
+    if st.sidebar.checkbox("🩺 Performance Diagnostics"):
+        st.markdown("---")
+        st.subheader("🩺 Performance Diagnostics")
+        st.caption(f"Process RSS: {perf.rss_bytes() / 2**20:,.1f} MB | Artefak termuat: {', '.join(store.loaded()) or '-'}")
+        st.caption(f"Versi artefak: {store.version or 'folder kerja (tanpa registry)'}")
+        if live_store.last_error: st.warning(f"Reload ditolak: {live_store.last_error}")
+        st.caption("Customer 360 cache: " + ", ".join(f"{k}={v}" for k, v in get_c360_cache().stats().items()))
+        if store.errors: st.error("Artefak gagal dimuat: " + "; ".join(f"{k} ({v})" for k, v in store.errors.items()))
+        d1, d2 = st.columns([3, 2])
+        with d1:
+            st.markdown("**⏱️ Timing per Section**")
+            st.dataframe(pd.DataFrame(perf.REGISTRY.summary()), use_container_width=True, hide_index=True)
+        with d2:
+            st.markdown("**🗃️ Cache Hit / Miss**")
+            st.dataframe(pd.DataFrame(perf.REGISTRY.cache_summary()), use_container_width=True, hide_index=True)
+            st.markdown("**🧠 RSS per Halaman**")
+            page_rss = pd.Series(perf.REGISTRY.page_rss, name="RSS (MB)") / 2**20
+            st.dataframe(page_rss.round(1), use_container_width=True)
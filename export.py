@@ -0,0 +1,112 @@
+import argparse
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from storage import DATA_DIR, scan_transactions, storage_available
+
+# --- Streaming Export ---
+# Export transaksi hasil filter per batch (RecordBatch) langsung ke file, tanpa membangun
+# string CSV / bytes penuh di memori. Format: CSV polos, CSV gzip / zstd, atau Parquet.
+# Dashboard memanggilnya hanya saat tombol download diklik (callable di st.download_button).
+# st.download_button selalu menahan seluruh isi file di memori, jadi export dari dashboard
+# dibatasi DASHBOARD_MAX_ROWS baris (env ASAH_EXPORT_MAX_ROWS); export penuh lewat CLI ini.
+#
+#   python export.py --country France --month 2011-11 --format csv.gz --out france_2011-11.csv.gz
+
+FORMATS = {
+    # nama: (ekstensi, mime, kompresi stream)
+    "csv": (".csv", "text/csv", None),
+    "csv.gz": (".csv.gz", "application/gzip", "gzip"),
+    "csv.zst": (".csv.zst", "application/zstd", "zstd"),
+    "parquet": (".parquet", "application/vnd.apache.parquet", None),
+}
+BATCH_SIZE = 65_536
+DASHBOARD_MAX_ROWS = int(os.environ.get("ASAH_EXPORT_MAX_ROWS", 500_000))
+
+
+def limit_batches(batches, max_rows=None):
+    # Berhenti membaca setelah max_rows baris (batch terakhir dipotong)
+    left = max_rows
+    for batch in batches:
+        if left is not None:
+            if left <= 0: return
+            if batch.num_rows > left: batch = batch.slice(0, left)
+            left -= batch.num_rows
+        yield batch
+
+
+def frame_batches(df, batch_size=BATCH_SIZE):
+    # Fallback tanpa Parquet: DataFrame in-memory diiris per batch
+    for start in range(0, len(df), batch_size):
+        yield pa.RecordBatch.from_pandas(df.iloc[start:start + batch_size], preserve_index=False)
+
+
+def _csv_batch(batch):
+    # Timestamp ditulis tanpa pecahan detik (sama seperti CSV dari pandas)
+    cols = [c.cast(pa.timestamp("s"), safe=False) if pa.types.is_timestamp(c.type) else c for c in batch.columns]
+    return pa.RecordBatch.from_arrays(cols, names=batch.schema.names)
+
+
+def write_export(dest, batches, fmt="csv.gz"):
+    # Tulis batch satu per satu ke dest; return jumlah baris
+    _, _, compression = FORMATS[fmt]
+    rows, writer = 0, None
+    if fmt == "parquet":
+        try:
+            for batch in batches:
+                if writer is None: writer = pq.ParquetWriter(dest, batch.schema, compression="zstd")
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            if writer is not None: writer.close()
+        if writer is None: open(dest, "wb").close()  # hasil filter kosong
+        return rows
+
+    with pa.OSFile(dest, "wb") as raw:
+        sink = pa.CompressedOutputStream(raw, compression) if compression else raw
+        for batch in batches:
+            batch = _csv_batch(batch)
+            if writer is None: writer = pacsv.CSVWriter(sink, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        if writer is not None: writer.close()
+        if compression: sink.close()
+    return rows
+
+
+def export_filtered(fmt="csv.gz", countries=None, months=None, clusters=None, path=DATA_DIR, df=None, dest=None, max_rows=None):
+    # Export ke file sementara (atau dest); df dipakai bila dataset Parquet tidak tersedia
+    if dest is None:
+        fd, dest = tempfile.mkstemp(prefix="asah_export_", suffix=FORMATS[fmt][0])
+        os.close(fd)
+    if df is None and storage_available(path):
+        batches = scan_transactions(path, countries=countries, months=months, clusters=clusters, batch_size=BATCH_SIZE)
+    else:
+        if countries: df = df[df["Country"].isin(countries)]
+        if months: df = df[df["YearMonth"].isin(months)]
+        if clusters: df = df[df["Cluster"].isin(clusters)]
+        batches = frame_batches(df)
+    write_export(dest, limit_batches(batches, max_rows), fmt)
+    return dest
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export transaksi (df_full_parquet) hasil filter secara streaming.")
+    p.add_argument("--data", default=DATA_DIR)
+    p.add_argument("--country", nargs="*", default=None)
+    p.add_argument("--month", nargs="*", default=None)
+    p.add_argument("--cluster", nargs="*", type=int, default=None)
+    p.add_argument("--format", choices=list(FORMATS), default="csv.gz")
+    p.add_argument("--out", required=True)
+    args = p.parse_args()
+
+    export_filtered(args.format, args.country, args.month, args.cluster, path=args.data, dest=args.out)
+    print(f"Export ditulis ke {args.out} ({os.path.getsize(args.out) / 2**20:,.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
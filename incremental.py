@@ -0,0 +1,350 @@
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from cleaning import clean_transactions
+from cluster_profiles import (PROFILE_COLUMNS, build_cluster_profiles, cluster_profiles_available, load_cluster_profiles,
+                              save_cluster_profiles, update_cluster_profiles)
+from customer_index import normalize_customer_ids
+from rfm_history import load_rfm_history, merge_rfm_history, rfm_history_available, save_rfm_history
+from user_item import USER_ITEM_DIR, UserItemMatrix, load_or_build_user_item, load_user_item, save_user_item
+
+# --- Incremental RFM & Cluster Update ---
+# Batch invoice baru di-apply ke state per customer (LastPurchase, Frequency, Monetary)
+# tanpa groupby ulang seluruh histori. Cluster di-assign dengan scaler + KMeans yang
+# tersimpan (cluster_model.pkl); re-fit model adalah langkah terpisah (`refit`).
+#
+#   python incremental.py init                      # state awal dari df_full_parquet + rfm.pkl
+#   python incremental.py update invoices_baru.csv  # apply batch harian
+#   python incremental.py reassign                  # assign ulang cluster semua customer (model lama)
+#   python incremental.py refit --k 4               # fit ulang scaler + KMeans
+#   python incremental.py --publish update ...      # + publish hasilnya sebagai versi baru di registry
+#
+# Catatan: update hanya meng-assign ulang cluster customer yang bertransaksi di batch.
+# Recency customer lain tetap dihitung ulang (murah), cluster-nya ikut berubah saat
+# `reassign` / `refit`. Kolom Cluster di histori df_full_parquet tidak ditulis ulang.
+# user_item/ (CSR) di-update langsung: hanya pasangan (customer, produk) di batch yang ditambah,
+# customer/produk baru ditambah di akhir (kode lama tetap). Tidak ada matriks dense.
+
+STATE_FILE = "rfm_state.pkl"
+MODEL_FILE = "cluster_model.pkl"
+FEATURES = ["Recency", "Frequency", "Monetary"]
+TOP_N = 10
+
+
+# --- Cluster Model ---
+def save_cluster_model(scaler, kmeans, path=MODEL_FILE, label_map=None):
+    if label_map is None: label_map = np.arange(kmeans.n_clusters)
+    with open(path, "wb") as f:
+        pickle.dump({"scaler": scaler, "kmeans": kmeans, "label_map": np.asarray(label_map), "features": FEATURES}, f)
+
+
+def load_cluster_model(path=MODEL_FILE):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def assign_clusters(model, rfm_values):
+    values = pd.DataFrame(np.asarray(rfm_values, dtype=np.float64), columns=model.get("features", FEATURES))
+    X = model["scaler"].transform(values)
+    return model["label_map"][model["kmeans"].predict(X)]
+
+
+# --- State ---
+class RFMState:
+    def __init__(self, customers, reference_date, invoices, cluster_item_counts):
+        self.customers = customers                      # index Customer ID -> LastPurchase, Recency, Frequency, Monetary, Cluster
+        self.reference_date = pd.Timestamp(reference_date)
+        self.invoices = invoices                        # np.array invoice (str, terurut) yang sudah dihitung
+        self.cluster_item_counts = cluster_item_counts  # Series (Cluster, Description) -> Quantity
+
+    def rfm(self):
+        return self.customers[FEATURES + ["Cluster"]].rename_axis("Customer ID").reset_index()
+
+    def topN_cluster(self, top_n=TOP_N):
+        counts = self.cluster_item_counts[self.cluster_item_counts != 0].rename("Quantity").reset_index()
+        counts = counts.sort_values(["Cluster", "Quantity"], ascending=[True, False])
+        return counts.groupby("Cluster").head(top_n)
+
+
+def build_state(df_full, rfm):
+    ids = normalize_customer_ids(df_full["Customer ID"]).to_numpy()
+    dates = pd.to_datetime(df_full["InvoiceDate"])
+    last = pd.Series(dates.to_numpy(), index=ids).groupby(level=0).max()
+
+    customers = rfm.assign(**{"Customer ID": normalize_customer_ids(rfm["Customer ID"]).to_numpy()})
+    customers = customers.set_index("Customer ID")[FEATURES + ["Cluster"]]
+    customers.insert(0, "LastPurchase", last.reindex(customers.index).to_numpy())
+    customers["Cluster"] = customers["Cluster"].astype("int64")
+
+    cluster_item_counts = df_full.groupby(["Cluster", "Description"], observed=True)["Quantity"].sum()
+    cluster_item_counts.index = cluster_item_counts.index.set_levels(
+        [cluster_item_counts.index.levels[0].astype("int64"), cluster_item_counts.index.levels[1].astype(str)])
+    return RFMState(
+        customers,
+        dates.max() + pd.Timedelta(days=1),
+        np.unique(df_full["Invoice"].astype(str).to_numpy()),
+        cluster_item_counts,
+    )
+
+
+def save_state(state, path=STATE_FILE):
+    with open(path, "wb") as f:
+        pickle.dump(state, f)
+
+
+def load_state(path=STATE_FILE):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# --- Incremental Update ---
+def _in_sorted(sorted_values, values):
+    pos = np.searchsorted(sorted_values, values)
+    pos = np.clip(pos, 0, max(len(sorted_values) - 1, 0))
+    return (sorted_values[pos] == values) if len(sorted_values) else np.zeros(len(values), dtype=bool)
+
+
+def _insert_sorted(sorted_values, values):
+    # Sisipkan invoice baru ke array terurut: searchsorted + insert (tanpa sort ulang seluruh histori)
+    new = np.unique(values[~_in_sorted(sorted_values, values)])
+    if not len(new): return sorted_values
+    return np.insert(sorted_values, np.searchsorted(sorted_values, new), new)
+
+
+def _cluster_item_counts(user_item, rows, clusters):
+    # Quantity per (Cluster, Description) dari baris-baris user_item: indikator cluster x CSR (sparse)
+    labels, group = np.unique(np.asarray(clusters, dtype=np.int64), return_inverse=True)
+    ind = sparse.csr_matrix((np.ones(len(rows), np.float64), (group, np.arange(len(rows)))), shape=(len(labels), len(rows)))
+    agg = (ind @ user_item.tocsr()[np.asarray(rows)]).tocoo()
+    names = np.asarray(user_item.items).astype(str)
+    counts = pd.Series(np.round(agg.data), index=pd.MultiIndex.from_arrays(
+        [labels[agg.row], names[agg.col]], names=["Cluster", "Description"]))
+    return counts[counts != 0]
+
+
+def _item_counts_of(user_item, row_index, customer_ids, clusters):
+    # Histori pembelian (per produk) dari sekelompok customer, diringkas per cluster
+    rows = row_index.get_indexer(np.asarray(customer_ids, dtype=np.int64))
+    return _cluster_item_counts(user_item, rows, clusters)
+
+
+def add_user_item_counts(user_item, pairs):
+    # pairs: Series (Customer ID, Description) -> Quantity. CSR lama + delta batch (sparse);
+    # customer/produk baru ditambah di akhir. Sama seperti from_transactions: hanya Quantity > 0.
+    cids = pairs.index.get_level_values(0).to_numpy(dtype=np.int64)
+    items = pairs.index.get_level_values(1).astype(str).to_numpy()
+    index, names = user_item.index, user_item.items
+    row_index, col_index = pd.Index(np.asarray(index)), pd.Index(np.asarray(names).astype(str))
+    new_rows = pd.unique(cids[row_index.get_indexer(cids) < 0])
+    new_cols = pd.unique(items[col_index.get_indexer(items) < 0])
+    if len(new_rows):
+        index = np.concatenate([np.asarray(index, dtype=np.int64), np.asarray(new_rows, dtype=np.int64)])
+        row_index = pd.Index(index)
+    if len(new_cols):
+        # Unicode lebar tetap di kedua sisi (bukan object) supaya items.npy tetap bisa di-mmap
+        names = np.concatenate([np.asarray(names).astype(str), np.asarray(new_cols).astype(str)])
+        col_index = pd.Index(names)
+
+    old = user_item.tocsr()
+    indptr = np.concatenate([old.indptr, np.full(len(new_rows), old.indptr[-1], dtype=old.indptr.dtype)])
+    shape = (len(index), len(names))
+    delta = sparse.csr_matrix((pairs.to_numpy(dtype=np.float32), (row_index.get_indexer(cids), col_index.get_indexer(items))), shape=shape)
+    csr = sparse.csr_matrix((old.data, old.indices, indptr), shape=shape) + delta
+    csr.data = np.maximum(csr.data, 0).astype(np.float32)
+    csr.eliminate_zeros()
+    csr.sort_indices()
+    idx_dtype = np.int32 if csr.nnz < np.iinfo(np.int32).max else np.int64
+    return UserItemMatrix(index, names, csr.data, csr.indices.astype(idx_dtype), csr.indptr.astype(idx_dtype))
+
+
+def apply_batch(state, model, raw_batch, user_item):
+    batch = clean_transactions(raw_batch)
+    if batch.empty: return state, user_item, batch
+
+    cust = state.customers
+
+    # Invoice yang sudah pernah di-apply (dikirim ulang) dibuang di awal: Frequency, Monetary,
+    # item counts, df_full dan index as-of memakai baris yang sama
+    inv = batch["Invoice"].astype(str).to_numpy()
+    is_new_invoice = ~_in_sorted(state.invoices, inv)
+    batch = batch.loc[is_new_invoice].copy()
+    if batch.empty: return state, user_item, batch
+    state.invoices = _insert_sorted(state.invoices, inv[is_new_invoice])
+
+    # 1. RFM per customer dari batch saja
+    agg = batch.groupby("Customer ID").agg(LastPurchase=("InvoiceDate", "max"), Monetary=("Revenue", "sum"))
+    agg["Frequency"] = batch.groupby("Customer ID")["Invoice"].nunique()
+
+    touched = agg.index
+    new_ids = touched.difference(cust.index)
+    if len(new_ids):
+        fresh = pd.DataFrame({"LastPurchase": pd.NaT, "Recency": 0, "Frequency": 0, "Monetary": 0.0, "Cluster": -1}, index=new_ids)
+        cust = pd.concat([cust, fresh.astype(cust.dtypes.to_dict())])
+    old_last = cust.loc[touched, "LastPurchase"]
+    cust.loc[touched, "LastPurchase"] = old_last.where(old_last >= agg["LastPurchase"], agg["LastPurchase"]).to_numpy()
+    cust.loc[touched, "Frequency"] = cust.loc[touched, "Frequency"].to_numpy() + agg["Frequency"].to_numpy()
+    cust.loc[touched, "Monetary"] = cust.loc[touched, "Monetary"].to_numpy() + agg["Monetary"].to_numpy()
+
+    # 2. Reference date maju -> Recency semua customer (vectorized, tanpa scan transaksi)
+    state.reference_date = max(state.reference_date, batch["InvoiceDate"].max() + pd.Timedelta(days=1))
+    cust["Recency"] = (state.reference_date - cust["LastPurchase"]).dt.days.fillna(cust["Recency"]).astype("int64")
+
+    # 3. Assign cluster customer yang tersentuh dengan model tersimpan
+    old_cluster = cust.loc[touched, "Cluster"].to_numpy()
+    new_cluster = assign_clusters(model, cust.loc[touched, FEATURES].to_numpy())
+    cust.loc[touched, "Cluster"] = new_cluster
+    state.customers = cust
+
+    # 4. topN_cluster counts: pindahkan histori customer yang ganti cluster, lalu tambah batch
+    counts = state.cluster_item_counts
+    moved = (old_cluster >= 0) & (old_cluster != new_cluster)
+    if moved.any():
+        row_index = pd.Index(np.asarray(user_item.index))
+        moved_ids = touched[moved]
+        known = moved_ids.isin(row_index)
+        counts = counts.sub(_item_counts_of(user_item, row_index, moved_ids[known], old_cluster[moved][known]), fill_value=0)
+        counts = counts.add(_item_counts_of(user_item, row_index, moved_ids[known], new_cluster[moved][known]), fill_value=0)
+    batch["Cluster"] = cust.loc[batch["Customer ID"], "Cluster"].to_numpy()
+    batch_counts = batch.groupby(["Cluster", "Description"])["Quantity"].sum()
+    state.cluster_item_counts = counts.add(batch_counts, fill_value=0).astype("int64")
+
+    # 5. user-item counts
+    pairs = batch.groupby(["Customer ID", "Description"], observed=True)["Quantity"].sum()
+    user_item = add_user_item_counts(user_item, pairs)
+
+    # Baris transaksi baru + kolom RFM/Cluster terkini (untuk di-append ke df_full)
+    enriched = batch.drop(columns="Cluster").merge(state.rfm(), on="Customer ID", how="left")
+    enriched["Date"] = enriched["InvoiceDate"].dt.date
+    return state, user_item, enriched
+
+
+# --- Reassign & Refit ---
+def reassign_all(state, model, user_item):
+    state.customers["Cluster"] = assign_clusters(model, state.customers[FEATURES].to_numpy())
+    state.cluster_item_counts = rebuild_cluster_item_counts(state, user_item)
+    return state
+
+
+def rebuild_cluster_item_counts(state, user_item):
+    clusters = state.customers["Cluster"].reindex(np.asarray(user_item.index)).fillna(-1).astype("int64").to_numpy()
+    rows = np.flatnonzero(clusters >= 0)
+    return _cluster_item_counts(user_item, rows, clusters[rows]).astype("int64")
+
+
+def refit(state, user_item, k=None, old_model=None, random_state=42):
+    from scipy.optimize import linear_sum_assignment
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import MinMaxScaler
+
+    X = state.customers[FEATURES].astype("float64")
+    k = k or (old_model["kmeans"].n_clusters if old_model else 4)
+    scaler = MinMaxScaler().fit(X)
+    kmeans = KMeans(n_clusters=k, random_state=random_state, n_init="auto").fit(scaler.transform(X))
+
+    # Samakan nomor cluster dengan model lama (supaya CLUSTER_PROFILE di dashboard tetap cocok)
+    label_map = np.arange(k)
+    if old_model is not None and old_model["kmeans"].n_clusters == k:
+        old_centers = old_model["scaler"].inverse_transform(old_model["kmeans"].cluster_centers_)
+        old_centers = old_centers[np.argsort(old_model["label_map"])]
+        cost = np.linalg.norm(kmeans.cluster_centers_[:, None, :] - scaler.transform(pd.DataFrame(old_centers, columns=FEATURES))[None, :, :], axis=2)
+        new_idx, old_label = linear_sum_assignment(cost)
+        label_map[new_idx] = old_label
+
+    model = {"scaler": scaler, "kmeans": kmeans, "label_map": label_map, "features": FEATURES}
+    return reassign_all(state, model, user_item), model
+
+
+# --- CLI ---
+def _load_user_item(path=USER_ITEM_DIR):
+    # Dibaca ke memori (bukan mmap) karena folder yang sama ditulis ulang di akhir update.
+    # Artefak lama (user_item_matrix.pkl) dikonversi sekali oleh load_or_build_user_item.
+    if not os.path.isdir(path): load_or_build_user_item(path)
+    return load_user_item(path, mmap=False)
+
+
+def _write_outputs(state, user_item, shared_vocab=False, new_rows=None, seen_invoices=None):
+    # shared_vocab: index/items user_item masih persis vocab/ -> hanya array CSR yang ditulis.
+    # seen_invoices: invoice yang sudah ada sebelum update (index as-of tidak menghitungnya lagi)
+    rfm = state.rfm()
+    rfm.to_pickle("rfm.pkl")
+    with open("topN_cluster.pkl", "wb") as f:
+        pickle.dump(state.topN_cluster(), f)
+    save_user_item(user_item, shared_vocab=shared_vocab)
+    save_state(state)
+    if cluster_profiles_available():
+        # Snapshot Cluster Insight: agregat lama + baris baru saja. Snapshot schema lama
+        # (tanpa agregat aditif) dibangun ulang sekali dari transaksi.
+        profiles = load_cluster_profiles()
+        if profiles is not None:
+            profiles = update_cluster_profiles(profiles, new_rows, rfm, state.cluster_item_counts)
+        else:
+            from storage import read_transactions
+            profiles = build_cluster_profiles(read_transactions(columns=PROFILE_COLUMNS), rfm)
+        save_cluster_profiles(profiles)
+    if rfm_history_available() and new_rows is not None:
+        # Invoice batch di-merge ke index as-of (termasuk yang bertanggal lampau), tanpa scan histori
+        save_rfm_history(merge_rfm_history(load_rfm_history(mmap=False), new_rows, seen_invoices))
+
+
+def main():
+    p = argparse.ArgumentParser(description="Update RFM, cluster, topN_cluster & user_item secara incremental.")
+    p.add_argument("--publish", action="store_true", help="Publish artefak hasil update ke registry (artifacts/)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("init", help="Bangun rfm_state.pkl dari df_full_parquet + rfm.pkl")
+    up = sub.add_parser("update", help="Apply file invoice baru (format Online Retail II)")
+    up.add_argument("files", nargs="+")
+    sub.add_parser("reassign", help="Assign ulang cluster semua customer dengan model tersimpan")
+    rf = sub.add_parser("refit", help="Fit ulang MinMaxScaler + KMeans pada state terkini")
+    rf.add_argument("--k", type=int, default=None)
+    args = p.parse_args()
+
+    if args.cmd == "init":
+        from storage import read_transactions
+        df_full = read_transactions(columns=["Invoice", "InvoiceDate", "Customer ID", "Cluster", "Description", "Quantity"])
+        save_state(build_state(df_full, pd.read_pickle("rfm.pkl")))
+        print(f"State disimpan ke {STATE_FILE}")
+        return
+
+    state = load_state()
+    user_item = base = _load_user_item()
+    model = load_cluster_model()
+    batches, seen_invoices = [], state.invoices
+
+    if args.cmd == "update":
+        from product_stats import (STATS_FILE, build_product_stats, load_product_stats, merge_product_stats,
+                                   product_stats_available, save_product_stats)
+        from rollup import ROLLUP_DIR, build_rollup, load_rollup, merge_rollup, rollup_available, save_rollup
+        from storage import append_transactions
+        for path in args.files:
+            raw = pd.read_csv(path, dtype={"Invoice": str, "StockCode": str})
+            state, user_item, new_rows = apply_batch(state, model, raw, user_item)
+            if new_rows.empty: continue
+            append_transactions(new_rows)
+            batches.append(new_rows)
+            if rollup_available(ROLLUP_DIR):
+                save_rollup(merge_rollup(load_rollup(ROLLUP_DIR), build_rollup(new_rows)), ROLLUP_DIR)
+            if product_stats_available(STATS_FILE):
+                save_product_stats(merge_product_stats(load_product_stats(STATS_FILE), build_product_stats(new_rows)), STATS_FILE)
+            print(f"{path}: {len(new_rows):,} baris, {new_rows['Customer ID'].nunique():,} customer di-update")
+    elif args.cmd == "reassign":
+        state = reassign_all(state, model, user_item)
+    elif args.cmd == "refit":
+        state, model = refit(state, user_item, k=args.k, old_model=model)
+        save_cluster_model(model["scaler"], model["kmeans"], label_map=model["label_map"])
+
+    shared = not os.path.isfile(os.path.join(USER_ITEM_DIR, "items.npy"))
+    _write_outputs(state, user_item, shared and user_item.index is base.index and user_item.items is base.items,
+                   pd.concat(batches, ignore_index=True) if batches else None, seen_invoices)
+    print(state.rfm()["Cluster"].value_counts().sort_index().to_string())
+    if args.publish:
+        from registry import publish
+        print(f"[registry] versi aktif: {publish('.')['version']}")
+
+
+if __name__ == "__main__":
+    main()
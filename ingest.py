@@ -0,0 +1,135 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from cleaning import RAW_COLUMNS, derive_columns, valid_rows_mask
+
+# --- Chunked Ingestion ---
+# online_retail_II.csv (boleh .gz) dibaca streaming per blok oleh pyarrow, tiap blok dibersihkan
+# di worker process dengan satu mask gabungan (cleaning.valid_rows_mask), lalu ditulis langsung
+# ke satu file Parquet (satu row group per blok). Duplikat antar blok dibuang lewat hash 64-bit
+# per baris, sehingga file multi-GB tidak perlu dimuat utuh ke RAM.
+# Hasilnya sama dengan cleaning.clean_transactions(pd.read_csv(...)) (urutan baris ikut sama);
+# float di-parse oleh pyarrow (round-trip exact), bisa beda 1 ulp dari parser CSV pandas.
+#
+#   python ingest.py online_retail_II.csv --out clean.parquet --workers 4
+
+BLOCK_MB = 64
+CLEAN_SCHEMA = pa.schema([
+    ("Invoice", pa.string()),
+    ("StockCode", pa.string()),
+    ("Description", pa.string()),
+    ("Quantity", pa.int64()),
+    ("InvoiceDate", pa.timestamp("us")),
+    ("Price", pa.float64()),
+    ("Customer ID", pa.int64()),
+    ("Country", pa.string()),
+    ("Revenue", pa.float64()),
+    ("YearMonth", pa.string()),
+])
+RAW_TYPES = {"Invoice": pa.string(), "StockCode": pa.string(), "Description": pa.string(), "Quantity": pa.float64(),
+             "InvoiceDate": pa.string(), "Price": pa.float64(), "Customer ID": pa.float64(), "Country": pa.string()}
+
+
+def hash_rows(df):
+    # Hash per baris atas kolom mentah; tipe numerik diseragamkan supaya hash konsisten antar blok
+    return pd.util.hash_pandas_object(df[RAW_COLUMNS].astype({"Quantity": "float64", "Price": "float64"}), index=False).to_numpy()
+
+
+def clean_chunk(df):
+    # Dijalankan di worker: filter + hash + kolom turunan untuk satu blok
+    out = df.loc[valid_rows_mask(df), RAW_COLUMNS].reset_index(drop=True)
+    hashes = hash_rows(out)
+    out["Quantity"] = out["Quantity"].astype("int64")
+    return derive_columns(out), hashes
+
+
+class HashDeduper:
+    # Hash baris yang sudah ditulis, disimpan sebagai array uint64 terurut (8 byte per baris unik)
+    def __init__(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.seen)
+
+    def keep_mask(self, hashes):
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        if len(self.seen):
+            pos = np.searchsorted(self.seen, hashes)
+            hit = self.seen[np.minimum(pos, len(self.seen) - 1)] == hashes
+            keep &= ~hit
+        new = np.sort(hashes[keep])
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, new), new)  # merge linear
+        return keep
+
+
+def read_blocks(path, block_mb=BLOCK_MB):
+    # Blok DataFrame dari CSV mentah (kompresi dideteksi dari ekstensi)
+    reader = pacsv.open_csv(
+        pa.input_stream(path, compression="detect"),
+        read_options=pacsv.ReadOptions(block_size=block_mb << 20),
+        convert_options=pacsv.ConvertOptions(column_types=RAW_TYPES, include_columns=RAW_COLUMNS),
+    )
+    for batch in reader:
+        if batch.num_rows: yield batch.to_pandas()
+
+
+def _clean_blocks(blocks, workers):
+    # Urutan blok dijaga; maksimal 2 x workers blok sedang diproses supaya memori tetap terbatas
+    if workers <= 1:
+        yield from map(clean_chunk, blocks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for block in blocks:
+            pending.append(ex.submit(clean_chunk, block))
+            if len(pending) >= workers * 2: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
+
+
+def ingest(raw_path, out_path, workers=None, block_mb=BLOCK_MB, drop_duplicates=True):
+    # raw CSV -> Parquet bersih; return statistik baris
+    workers = workers or os.cpu_count() or 1
+    dedup = HashDeduper() if drop_duplicates else None
+    stats = {"blocks": 0, "valid_rows": 0, "duplicates": 0, "rows": 0}
+    tmp = out_path + ".tmp"
+    with pq.ParquetWriter(tmp, CLEAN_SCHEMA, compression="zstd") as writer:
+        for df, hashes in _clean_blocks(read_blocks(raw_path, block_mb), workers):
+            stats["blocks"] += 1
+            stats["valid_rows"] += len(df)
+            if dedup is not None:
+                keep = dedup.keep_mask(hashes)
+                stats["duplicates"] += int((~keep).sum())
+                df = df[keep]
+            if df.empty: continue
+            writer.write_table(pa.Table.from_pandas(df, schema=CLEAN_SCHEMA, preserve_index=False))
+            stats["rows"] += len(df)
+    os.replace(tmp, out_path)
+    return stats
+
+
+def main():
+    p = argparse.ArgumentParser(description="Ingest + cleaning online_retail_II.csv per blok (multi-proses) ke Parquet.")
+    p.add_argument("raw", help="CSV mentah (boleh .gz)")
+    p.add_argument("--out", default="clean_transactions.parquet")
+    p.add_argument("--workers", type=int, default=None, help="Jumlah proses cleaning (default: semua core)")
+    p.add_argument("--block-mb", type=int, default=BLOCK_MB, help="Ukuran blok baca CSV (MB)")
+    p.add_argument("--keep-duplicates", action="store_true")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    stats = ingest(args.raw, args.out, args.workers, args.block_mb, drop_duplicates=not args.keep_duplicates)
+    print(f"{stats['rows']:,} baris bersih ({stats['duplicates']:,} duplikat dibuang, {stats['blocks']} blok) "
+          f"-> {args.out} dalam {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import argparse
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from registry import is_published
+from vocab import load_vocabulary, same_products, vocab_dir_of
+
+# --- Sparse Top-K Item Neighbor Index ---
+# Pengganti item_similarity_df (dense Description x Description).
+# Per produk hanya disimpan K tetangga terdekat (index + skor) dalam array,
+# sehingga lookup "similar products" cukup satu slicing, tanpa sort seluruh katalog.
+# Format utama: folder berisi .npy tanpa kompresi -> dibuka dengan mmap_mode="r" dan dibagi
+# antar session / proses lewat page cache. File .npz (compressed) tetap bisa dibaca.
+# Build pipeline memakai kode produk vocab bersama: items tidak disimpan, dibaca dari vocab/.
+#
+# build_item_neighbors_sparse: cosine langsung dari user_item (CSR), dihitung per blok baris
+# produk di beberapa worker process. Tiap blok hanya menyimpan top-K di atas --min-score,
+# sehingga matriks similarity N x N penuh tidak pernah ada di memori.
+#
+#   python item_neighbors.py --user-item user_item --out item_neighbors --k 50 --workers 8
+
+NEIGHBORS_DIR = "item_neighbors"
+NEIGHBORS_FILE = "item_neighbors.npz"
+ARRAYS = ["items", "neighbor_idx", "neighbor_scores"]
+DEFAULT_K = 50
+MEMORY_MB = 256      # batas memori kerja satu blok per worker
+BYTES_PER_CELL = 20  # blok float32 + copy + argpartition (int64) per sel similarity
+
+
+class ItemNeighbors:
+    def __init__(self, items, neighbor_idx, neighbor_scores):
+        self.items = np.asanyarray(items)  # tetap objek yang sama (mis. vocab mmap) -> same_products O(1)
+        self.neighbor_idx = np.asarray(neighbor_idx, dtype=np.int32)          # (n_items, K), -1 = kosong
+        self.neighbor_scores = np.asarray(neighbor_scores, dtype=np.float32)  # (n_items, K), urut desc
+        self.code = {item: i for i, item in enumerate(self.items.tolist())}
+        self._index = None
+        self._sparse = None
+
+    @property
+    def k(self):
+        return self.neighbor_idx.shape[1]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.code
+
+    def get_indexer(self, names):
+        # Nama produk -> kode (-1 = tidak ada), pd.Index dibangun sekali
+        if self._index is None: self._index = pd.Index(self.items.astype(str))
+        return self._index.get_indexer(np.asarray(names).astype(str))
+
+    def similar(self, item, n=5):
+        i = self.code.get(item)
+        if i is None: return []
+        idx = self.neighbor_idx[i, :n]
+        return self.items[idx[idx >= 0]].tolist()
+
+    def similar_with_scores(self, item, n=5):
+        i = self.code.get(item)
+        if i is None: return []
+        idx, sc = self.neighbor_idx[i, :n], self.neighbor_scores[i, :n]
+        keep = idx >= 0
+        return list(zip(self.items[idx[keep]].tolist(), sc[keep].tolist()))
+
+    def aligned(self, items):
+        # Index dalam urutan kode `items` (kolom user_item), items = objek yang sama -> lookup tanpa remap.
+        # Vocab bersama: hanya ganti referensi; artefak lama: remap sekali saat load.
+        if same_products(self.items, items):
+            return self if self.items is items else ItemNeighbors(items, self.neighbor_idx, self.neighbor_scores)
+        to_new = pd.Index(np.asarray(items).astype(str)).get_indexer(self.items.astype(str)).astype(np.int32)
+        from_old = self.get_indexer(items)
+        idx = np.full((len(items), self.k), -1, dtype=np.int32)
+        scores = np.zeros((len(items), self.k), dtype=np.float32)
+        has = from_old >= 0
+        old = self.neighbor_idx[from_old[has]]
+        mapped = np.where(old >= 0, to_new[np.maximum(old, 0)], -1)
+        # Tetangga yang tidak ada di `items` dibuang, sisanya tetap urut skor desc
+        order = np.argsort(mapped < 0, axis=1, kind="stable")
+        mapped = np.take_along_axis(mapped, order, axis=1)
+        idx[has] = mapped
+        scores[has] = np.where(mapped >= 0, np.take_along_axis(self.neighbor_scores[from_old[has]], order, axis=1), 0.0)
+        return ItemNeighbors(items, idx, scores)
+
+    def to_sparse(self, items=None):
+        # Matriks similarity sparse (baris = produk, kolom = tetangganya), opsional dalam urutan `items`
+        if items is None and self._sparse is not None: return self._sparse
+        if items is None:
+            remap, size = np.arange(len(self.items)), len(self.items)
+        else:
+            remap = pd.Index(np.asarray(items).astype(str)).get_indexer(self.items.astype(str))
+            size = len(items)
+        rows = np.repeat(remap, self.k)
+        cols = remap[np.maximum(self.neighbor_idx, 0)].ravel()
+        data = self.neighbor_scores.ravel()
+        keep = (rows >= 0) & (cols >= 0) & (self.neighbor_idx.ravel() >= 0) & (data > 0)
+        mat = sparse.csr_matrix((data[keep], (rows[keep], cols[keep])), shape=(size, size), dtype=np.float32)
+        if items is None: self._sparse = mat
+        return mat
+
+    def nbytes(self):
+        return self.neighbor_idx.nbytes + self.neighbor_scores.nbytes + self.items.nbytes
+
+
+def topk_rows(sim_block, k, row_offset=0):
+    # Ambil top-k per baris dari satu blok similarity (tanpa diri sendiri)
+    block = np.array(sim_block, dtype=np.float32, copy=True)
+    rows = np.arange(block.shape[0])
+    self_cols = rows + row_offset
+    valid = self_cols < block.shape[1]
+    block[rows[valid], self_cols[valid]] = -np.inf
+
+    k = min(k, block.shape[1] - 1) if block.shape[1] > 1 else 0
+    if k <= 0:
+        return np.full((block.shape[0], 0), -1, np.int32), np.zeros((block.shape[0], 0), np.float32)
+
+    part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1).astype(np.int32)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+    idx[~np.isfinite(scores)] = -1
+    scores[~np.isfinite(scores)] = 0.0
+    return idx, scores.astype(np.float32)
+
+
+def build_item_neighbors(item_similarity_df, k=DEFAULT_K, block_size=1024):
+    # Build dari similarity frame yang sudah ada (diproses per blok baris)
+    items = item_similarity_df.columns.to_numpy()
+    sim = item_similarity_df.to_numpy(dtype=np.float32, copy=False)
+    idx_parts, score_parts = [], []
+    for start in range(0, sim.shape[0], block_size):
+        idx, scores = topk_rows(sim[start:start + block_size], k, row_offset=start)
+        idx_parts.append(idx)
+        score_parts.append(scores)
+    return ItemNeighbors(items.astype(str), np.vstack(idx_parts), np.vstack(score_parts))
+
+
+# --- Blocked Sparse Builder ---
+_VECTORS = None
+
+
+def item_vectors(uim):
+    # Produk x customer (CSR) dengan baris dinormalisasi L2 -> dot product = cosine similarity
+    X = uim.tocsr().T.tocsr().astype(np.float32)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0).astype(np.float32)
+    return sparse.csr_matrix(sparse.diags(inv) @ X)
+
+
+def _init_worker(vectors):
+    # Sekali per worker: vektor produk + transposenya (CSR) untuk semua blok
+    global _VECTORS
+    _VECTORS = (vectors, vectors.T.tocsr())
+
+
+def _block_topk(start, end, k, min_score):
+    vectors, vectors_t = _VECTORS
+    block = (vectors[start:end] @ vectors_t).toarray()
+    idx, scores = topk_rows(block, k, row_offset=start)
+    weak = scores <= min_score
+    idx[weak] = -1
+    scores[weak] = 0.0
+    return idx, scores
+
+
+def build_item_neighbors_sparse(uim, k=DEFAULT_K, min_score=0.0, workers=None, memory_mb=MEMORY_MB):
+    global _VECTORS
+    vectors = item_vectors(uim)
+    n = vectors.shape[0]
+    if n == 0: return ItemNeighbors(np.asarray(uim.items).astype(str), np.empty((0, 0), np.int32), np.empty((0, 0), np.float32))
+    # Jumlah baris per blok mengikuti memory_mb (blok dense block_rows x n)
+    block_rows = int(max(1, min(n, (memory_mb << 20) // (n * BYTES_PER_CELL))))
+    starts = list(range(0, n, block_rows))
+    ends = [min(s + block_rows, n) for s in starts]
+    workers = min(workers or os.cpu_count() or 1, len(starts))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors,)) as ex:
+            parts = list(ex.map(_block_topk, starts, ends, [k] * len(starts), [min_score] * len(starts)))
+    else:
+        _init_worker(vectors)
+        try: parts = [_block_topk(s, e, k, min_score) for s, e in zip(starts, ends)]
+        finally: _VECTORS = None
+    return ItemNeighbors(np.asarray(uim.items).astype(str), np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts]))
+
+
+def save_item_neighbors(nbrs, path=NEIGHBORS_DIR, shared_vocab=False):
+    arrays = {"items": nbrs.items.astype(str), "neighbor_idx": nbrs.neighbor_idx, "neighbor_scores": nbrs.neighbor_scores}
+    if path.endswith(".npz"):
+        np.savez_compressed(path, **arrays)
+        return
+    if shared_vocab: del arrays["items"]  # urutan produk = vocab/products.npy
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"  # unik per proses (beberapa worker bisa menulis bersamaan)
+    os.makedirs(tmp)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    shutil.rmtree(path, ignore_errors=True)
+    try: os.replace(tmp, path)
+    finally: shutil.rmtree(tmp, ignore_errors=True)  # sisa tmp bila proses lain lebih dulu mengganti path
+
+
+def load_item_neighbors(path=NEIGHBORS_DIR, mmap=True, vocab=None):
+    if os.path.isdir(path):
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+                  for name in ARRAYS if os.path.isfile(os.path.join(path, f"{name}.npy"))}
+        if "items" not in arrays: arrays["items"] = (vocab or load_vocabulary(vocab_dir_of(path), mmap)).products
+        return ItemNeighbors(*[arrays[name] for name in ARRAYS])
+    with np.load(path, allow_pickle=False) as z:
+        return ItemNeighbors(z["items"], z["neighbor_idx"], z["neighbor_scores"])
+
+
+def load_or_build_item_neighbors(path=NEIGHBORS_DIR, legacy_pkl=None, k=DEFAULT_K, vocab=None):
+    # Fallback: .npz atau artefak lama (dense pkl) dikonversi sekali ke format mmap lalu disimpan
+    # (di folder versi registry hanya di memori; versi publish tidak boleh berubah)
+    if os.path.isdir(path): return load_item_neighbors(path, vocab=vocab)
+    base = os.path.dirname(path)
+    npz = os.path.join(base, NEIGHBORS_FILE)
+    if os.path.isfile(npz): nbrs = load_item_neighbors(npz)
+    else: nbrs = build_item_neighbors(pd.read_pickle(legacy_pkl or os.path.join(base, "item_similarity_df.pkl")), k=k)
+    if is_published(path): return nbrs
+    try:
+        save_item_neighbors(nbrs, path)
+        return load_item_neighbors(path)
+    except OSError:
+        return nbrs
+
+
+def main():
+    from user_item import USER_ITEM_DIR, load_user_item
+    p = argparse.ArgumentParser(description="Bangun item neighbors (top-K cosine) dari user_item sparse, per blok & paralel.")
+    p.add_argument("--user-item", default=USER_ITEM_DIR, help="Folder user_item (CSR .npy)")
+    p.add_argument("--out", default=NEIGHBORS_DIR)
+    p.add_argument("--k", type=int, default=DEFAULT_K)
+    p.add_argument("--min-score", type=float, default=0.0, help="Tetangga dengan cosine <= nilai ini dibuang")
+    p.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: semua core)")
+    p.add_argument("--memory-mb", type=int, default=MEMORY_MB, help="Batas memori blok per worker")
+    args = p.parse_args()
+
+    nbrs = build_item_neighbors_sparse(load_user_item(args.user_item), k=args.k, min_score=args.min_score,
+                                       workers=args.workers, memory_mb=args.memory_mb)
+    save_item_neighbors(nbrs, args.out)
+    print(f"[item_neighbors] {len(nbrs):,} produk, K={nbrs.k}, {nbrs.nbytes() / 2**20:,.1f} MB -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
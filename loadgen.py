@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Load Generator untuk service.py ---
+# Mengirim GET /recommend secara bersamaan (keep-alive, tanpa dependency tambahan)
+# lalu mencetak throughput dan latency p50/p90/p99.
+#
+#   python service.py --port 8000 &
+#   python loadgen.py --port 8000 --concurrency 64 --requests 20000
+
+
+async def _worker(host, port, ids, n_requests, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            cid = random.choice(ids)
+            req = f"GET /recommend?customer_id={cid} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n"
+            t0 = time.perf_counter()
+            writer.write(req.encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""): break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length": length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            parts = status_line.split()
+            if len(parts) < 2 or parts[1] not in (b"200", b"404"):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def run(host, port, ids, concurrency, total):
+    latencies, errors = [], []
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_worker(host, port, ids, k, latencies, errors) for k in per_worker if k > 0])
+    elapsed = time.perf_counter() - t0
+    return np.array(latencies) * 1000.0, errors, elapsed
+
+
+def main():
+    p = argparse.ArgumentParser(description="Load test untuk recommendation service.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--requests", type=int, default=5000)
+    p.add_argument("--rfm", default="rfm.pkl", help="Sumber Customer ID untuk request")
+    p.add_argument("--json", help="Simpan ringkasan hasil ke file JSON")
+    args = p.parse_args()
+
+    ids = pd.to_numeric(pd.read_pickle(args.rfm)["Customer ID"], errors="coerce").dropna().astype("int64").tolist()
+    lat, errors, elapsed = asyncio.run(run(args.host, args.port, ids, args.concurrency, args.requests))
+
+    summary = {
+        "requests": int(len(lat)),
+        "concurrency": args.concurrency,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(lat) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p90_ms": round(float(np.percentile(lat, 90)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "max_ms": round(float(lat.max()), 3),
+    }
+    print(f"{summary['requests']:,} request | concurrency {args.concurrency} | {summary['throughput_rps']:,} req/s")
+    print(f"p50 {summary['p50_ms']} ms | p90 {summary['p90_ms']} ms | p99 {summary['p99_ms']} ms | max {summary['max_ms']} ms | error {summary['errors']}")
+    if args.json:
+        with open(args.json, "w") as f: json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+
+# --- Performance Instrumentation ---
+# Registry per proses untuk durasi & perubahan RSS per section, hit/miss cache, dan RSS per halaman.
+# Dibaca oleh panel diagnostik dashboard dan diekspor dalam format teks Prometheus:
+#   - ASAH_METRICS_FILE=/var/lib/node_exporter/asah.prom  -> file ditulis ulang setelah tiap rerun
+#   - ASAH_METRICS_PORT=9108                              -> GET http://host:9108/metrics
+#
+#   with perf.timed("eda.summarize"): ...
+#   @perf.timed_fn("product_cards")
+#   perf.count_cache("store.rfm", hit=True)
+
+PREFIX = "asah"
+RECENT = 200  # jumlah sampel terakhir per section untuk panel (p50/p95)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def rss_bytes():
+    # RSS proses saat ini (Linux /proc), fallback ke peak RSS dari resource
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Section:
+    def __init__(self):
+        self.recent = deque(maxlen=RECENT)  # (timestamp, detik, delta RSS bytes)
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds, rss_delta):
+        self.recent.append((time.time(), seconds, rss_delta))
+        self.count += 1
+        self.total += seconds
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le: self.buckets[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sections = defaultdict(Section)
+        self.cache = defaultdict(lambda: {"hit": 0, "miss": 0})
+        self.page_rss = {}
+
+    def record(self, name, seconds, rss_delta=0):
+        with self.lock: self.sections[name].add(seconds, rss_delta)
+
+    def count_cache(self, name, hit):
+        with self.lock: self.cache[name]["hit" if hit else "miss"] += 1
+
+    def page(self, name):
+        with self.lock: self.page_rss[name] = rss_bytes()
+
+    def summary(self):
+        # Satu baris per section untuk panel diagnostik
+        with self.lock: items = [(name, s.count, list(s.recent)) for name, s in self.sections.items()]
+        rows = []
+        for name, count, recent in sorted(items):
+            secs = np.array([r[1] for r in recent]) * 1000
+            rows.append({
+                "Section": name,
+                "Calls": count,
+                "Last (ms)": round(secs[-1], 2),
+                "p50 (ms)": round(float(np.percentile(secs, 50)), 2),
+                "p95 (ms)": round(float(np.percentile(secs, 95)), 2),
+                "Max (ms)": round(float(secs.max()), 2),
+                "Last ΔRSS (MB)": round(recent[-1][2] / 2**20, 2),
+            })
+        return rows
+
+    def cache_summary(self):
+        with self.lock: items = {k: dict(v) for k, v in self.cache.items()}
+        return [{"Cache": k, "Hit": v["hit"], "Miss": v["miss"],
+                 "Hit Rate": round(v["hit"] / max(v["hit"] + v["miss"], 1), 3)} for k, v in sorted(items.items())]
+
+    def render_prometheus(self):
+        lines = [f"# HELP {PREFIX}_section_duration_seconds Durasi per section dashboard.",
+                 f"# TYPE {PREFIX}_section_duration_seconds histogram"]
+        with self.lock:
+            for name, s in sorted(self.sections.items()):
+                for le, n in zip(BUCKETS, s.buckets):
+                    lines.append(f'{PREFIX}_section_duration_seconds_bucket{{section="{name}",le="{le}"}} {n}')
+                lines.append(f'{PREFIX}_section_duration_seconds_bucket{{section="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'{PREFIX}_section_duration_seconds_sum{{section="{name}"}} {s.total:.6f}')
+                lines.append(f'{PREFIX}_section_duration_seconds_count{{section="{name}"}} {s.count}')
+            lines += [f"# HELP {PREFIX}_cache_requests_total Hit/miss cache artefak & filter.",
+                      f"# TYPE {PREFIX}_cache_requests_total counter"]
+            for name, c in sorted(self.cache.items()):
+                for result in ("hit", "miss"):
+                    lines.append(f'{PREFIX}_cache_requests_total{{cache="{name}",result="{result}"}} {c[result]}')
+            lines += [f"# HELP {PREFIX}_page_rss_bytes RSS proses di akhir render halaman.",
+                      f"# TYPE {PREFIX}_page_rss_bytes gauge"]
+            for name, v in sorted(self.page_rss.items()):
+                lines.append(f'{PREFIX}_page_rss_bytes{{page="{name}"}} {v}')
+        lines += [f"# HELP {PREFIX}_process_rss_bytes RSS proses saat ini.",
+                  f"# TYPE {PREFIX}_process_rss_bytes gauge",
+                  f"{PREFIX}_process_rss_bytes {rss_bytes()}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Format textfile collector node_exporter; tulis ke tmp lalu rename (atomic)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f: f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed(name, registry=REGISTRY):
+    rss0 = rss_bytes()
+    t0 = time.perf_counter()
+    try: yield
+    finally: registry.record(name, time.perf_counter() - t0, rss_bytes() - rss0)
+
+
+def mark():
+    return time.perf_counter(), rss_bytes()
+
+
+def since(name, start, registry=REGISTRY):
+    # Pasangan mark()/since() untuk blok panjang yang tidak praktis dibungkus `with`
+    t0, rss0 = start
+    registry.record(name, time.perf_counter() - t0, rss_bytes() - rss0)
+
+
+def timed_fn(name, registry=REGISTRY):
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name, registry): return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def count_cache(name, hit, registry=REGISTRY):
+    registry.count_cache(name, hit)
+
+
+def record_page(name, registry=REGISTRY):
+    registry.page(name)
+
+
+def export(registry=REGISTRY):
+    # Dipanggil di akhir rerun dashboard: tulis file .prom bila ASAH_METRICS_FILE di-set
+    path = os.environ.get("ASAH_METRICS_FILE")
+    if path:
+        try: registry.write_prometheus(path)
+        except OSError: pass
+
+
+def start_metrics_server(port, host="0.0.0.0", registry=REGISTRY):
+    # Endpoint /metrics lokal (thread daemon), dipanggil sekali per proses
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
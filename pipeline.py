@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ingest import BLOCK_MB, ingest
+
+# --- Offline Training Pipeline ---
+# Versi modul + CLI dari notebook Final_Project_ASAH.ipynb:
+#   clean -> rfm -> select-k -> cluster -> artifacts
+# Stage clean memakai ingest.py (CSV dibaca per blok di beberapa proses, langsung ke Parquet).
+# Setiap stage di-cache di --cache-dir dengan key hash (input + parameter), sehingga
+# menjalankan ulang satu stage tidak mengulang stage sebelumnya.
+#
+#   python pipeline.py --raw online_retail_II.csv                 # semua stage
+#   python pipeline.py --raw online_retail_II.csv --stage select-k --k-max 12 --silhouette-sample 20000
+#   python pipeline.py --raw online_retail_II.csv --stage artifacts --k 4 --out .
+#   python pipeline.py --raw online_retail_II.csv --out build --registry artifacts   # + publish versi baru
+
+STAGES = ["clean", "rfm", "select-k", "cluster", "artifacts"]
+FEATURES = ["Recency", "Frequency", "Monetary"]
+CACHE_DIR = ".pipeline_cache"
+
+
+# --- Cache ---
+def _hash(*parts):
+    h = hashlib.sha1()
+    for p in parts: h.update(repr(p).encode())
+    return h.hexdigest()[:16]
+
+
+def _file_fingerprint(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, int(st.st_mtime))
+
+
+class StageCache:
+    def __init__(self, cache_dir=CACHE_DIR, force=()):
+        self.cache_dir = cache_dir
+        self.force = set(force)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, name, key, ext):
+        return os.path.join(self.cache_dir, f"{name}-{key}.{ext}")
+
+    def get(self, name, key, compute, ext="parquet"):
+        path = self._path(name, key, ext)
+        if name not in self.force and os.path.exists(path):
+            print(f"[{name}] cache hit ({os.path.basename(path)})")
+            return self._load(path, ext)
+        t0 = time.perf_counter()
+        result = compute()
+        self._save(result, path, ext)
+        print(f"[{name}] selesai dalam {time.perf_counter() - t0:.1f}s")
+        return result
+
+    def get_file(self, name, key, compute, ext="parquet"):
+        # Untuk stage yang menulis file sendiri (streaming): compute(dest) lalu path dikembalikan
+        path = self._path(name, key, ext)
+        if name in self.force or not os.path.exists(path):
+            t0 = time.perf_counter()
+            compute(path)
+            print(f"[{name}] selesai dalam {time.perf_counter() - t0:.1f}s")
+        else:
+            print(f"[{name}] cache hit ({os.path.basename(path)})")
+        return path
+
+    def _load(self, path, ext):
+        if ext == "parquet": return pd.read_parquet(path)
+        with open(path, "rb") as f: return pickle.load(f)
+
+    def _save(self, result, path, ext):
+        tmp = path + ".tmp"
+        if ext == "parquet": result.to_parquet(tmp, index=False)
+        else:
+            with open(tmp, "wb") as f: pickle.dump(result, f)
+        os.replace(tmp, path)
+
+
+# --- Stages ---
+def stage_clean(raw_path, dest, workers=None, block_mb=BLOCK_MB):
+    stats = ingest(raw_path, dest, workers=workers, block_mb=block_mb)
+    print(f"[clean] {stats['rows']:,} baris bersih, {stats['duplicates']:,} duplikat dibuang ({stats['blocks']} blok)")
+
+
+def stage_rfm(df):
+    reference_date = df["InvoiceDate"].max() + pd.Timedelta(days=1)
+    rfm = df.groupby("Customer ID").agg(
+        LastPurchase=("InvoiceDate", "max"),
+        Frequency=("Invoice", "nunique"),
+        Monetary=("Revenue", "sum"),
+    )
+    rfm.insert(0, "Recency", (reference_date - rfm.pop("LastPurchase")).dt.days)
+    return rfm.reset_index()
+
+
+def _scale(rfm):
+    from sklearn.preprocessing import MinMaxScaler
+    scaler = MinMaxScaler()
+    return scaler, scaler.fit_transform(rfm[FEATURES])
+
+
+def _make_kmeans(k, minibatch, random_state=42):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    if minibatch: return MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init="auto", batch_size=4096)
+    return KMeans(n_clusters=k, random_state=random_state, n_init="auto")
+
+
+def evaluate_k(k, X, silhouette_sample=None, minibatch=False, random_state=42):
+    # Dijalankan di worker process: fit satu k lalu hitung inertia, Silhouette, DBI, CHI
+    from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_score
+    model = _make_kmeans(k, minibatch, random_state)
+    labels = model.fit_predict(X)
+    # Silhouette O(n^2): pakai sampel bila customer lebih banyak dari silhouette_sample
+    sample = silhouette_sample if silhouette_sample and silhouette_sample < len(X) else None
+    return {
+        "k": k,
+        "inertia": float(model.inertia_),
+        "silhouette": float(silhouette_score(X, labels, sample_size=sample, random_state=random_state)),
+        "dbi": float(davies_bouldin_score(X, labels)),
+        "chi": float(calinski_harabasz_score(X, labels)),
+    }
+
+
+def stage_select_k(rfm, k_values, workers=None, silhouette_sample=None, minibatch=False):
+    _, X = _scale(rfm)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(k_values) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(k_values))) as ex:
+            futures = [ex.submit(evaluate_k, k, X, silhouette_sample, minibatch) for k in k_values]
+            rows = [f.result() for f in futures]
+    else:
+        rows = [evaluate_k(k, X, silhouette_sample, minibatch) for k in k_values]
+    return pd.DataFrame(rows).sort_values("k").reset_index(drop=True)
+
+
+def stage_cluster(rfm, k, minibatch=False):
+    scaler, X = _scale(rfm)
+    kmeans = _make_kmeans(k, minibatch).fit(X)
+    rfm = rfm.copy()
+    rfm["Cluster"] = kmeans.labels_
+    return {"rfm": rfm, "scaler": scaler, "kmeans": kmeans}
+
+
+def stage_artifacts(df, clustered, out_dir=".", top_n=10, neighbors_k=50, workers=None, dense_matrix=False):
+    from cluster_profiles import build_cluster_profiles, save_cluster_profiles
+    from incremental import build_state, save_cluster_model, save_state
+    from item_neighbors import build_item_neighbors_sparse, save_item_neighbors
+    from product_stats import build_product_stats, save_product_stats
+    from rfm_history import build_rfm_history, save_rfm_history
+    from rollup import build_rollup, save_rollup
+    from storage import write_transactions
+    from user_item import from_transactions, save_user_item
+    from vocab import build_vocabulary, save_vocabulary
+
+    out = lambda name: os.path.join(out_dir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    rfm = clustered["rfm"]
+
+    df_full = df.merge(rfm, on="Customer ID", how="left")
+    df_full["Date"] = df_full["InvoiceDate"].dt.date
+
+    # Vocab bersama: produk & customer -> kode int32; artefak model hanya menyimpan kode
+    vocab = build_vocabulary(df_full)
+    topN_cluster = (
+        df_full.groupby(["Cluster", "Description"])["Quantity"].sum()
+        .reset_index()
+        .sort_values(["Cluster", "Quantity"], ascending=[True, False])
+        .groupby("Cluster").head(top_n)
+    )
+    topN_cluster = topN_cluster.assign(Item=vocab.product_codes(topN_cluster["Description"]))[["Cluster", "Item", "Quantity"]]
+    # User-item sparse langsung dari transaksi; similarity per blok di beberapa proses (top-K saja)
+    user_item = from_transactions(df_full, vocab)
+    item_neighbors = build_item_neighbors_sparse(user_item, k=neighbors_k, workers=workers)
+
+    write_transactions(df_full, out("df_full_parquet"))
+    save_rollup(build_rollup(df_full), out("rollup"))
+    save_product_stats(build_product_stats(df_full), out("product_stats.parquet"))
+    save_cluster_profiles(build_cluster_profiles(df_full, rfm), out("cluster_profiles.json"))
+    save_rfm_history(build_rfm_history(df_full), out("rfm_history"))
+    rfm.to_pickle(out("rfm.pkl"))
+    with open(out("topN_cluster.pkl"), "wb") as f:
+        pickle.dump(topN_cluster, f)
+    if dense_matrix:
+        # Pivot dense opsional (notebook / tool lama); incremental.py memakai user_item/ (CSR)
+        df_full.pivot_table(index="Customer ID", columns="Description", values="Quantity", aggfunc="sum", fill_value=0).to_pickle(out("user_item_matrix.pkl"))
+    save_vocabulary(vocab, out("vocab"))
+    save_user_item(user_item, out("user_item"), shared_vocab=True)
+    save_cluster_model(clustered["scaler"], clustered["kmeans"], out("cluster_model.pkl"))
+    save_state(build_state(df_full, rfm), out("rfm_state.pkl"))
+    save_item_neighbors(item_neighbors, out("item_neighbors"), shared_vocab=True)
+
+
+# --- Runner ---
+def run(raw_path, stage="all", k=4, k_values=range(2, 10), workers=None, silhouette_sample=10_000,
+        minibatch=False, out_dir=".", cache_dir=CACHE_DIR, force=(), registry_dir=None, neighbors_k=50, dense_matrix=False):
+    cache = StageCache(cache_dir, force)
+    upto = len(STAGES) if stage == "all" else STAGES.index(stage) + 1
+
+    key_clean = _hash("clean", _file_fingerprint(raw_path))
+    df = pd.read_parquet(cache.get_file("clean", key_clean, lambda dest: stage_clean(raw_path, dest, workers)))
+    if upto == 1: return df
+
+    key_rfm = _hash("rfm", key_clean)
+    rfm = cache.get("rfm", key_rfm, lambda: stage_rfm(df))
+    if upto == 2: return rfm
+
+    if stage in ("all", "select-k"):
+        key_sel = _hash("select-k", key_rfm, list(k_values), silhouette_sample, minibatch)
+        scores = cache.get("select-k", key_sel, lambda: stage_select_k(rfm, list(k_values), workers, silhouette_sample, minibatch))
+        print(scores.to_string(index=False))
+        if stage == "select-k": return scores
+
+    key_cluster = _hash("cluster", key_rfm, k, minibatch)
+    clustered = cache.get("cluster", key_cluster, lambda: stage_cluster(rfm, k, minibatch), ext="pkl")
+    print(clustered["rfm"]["Cluster"].value_counts().sort_index().to_string())
+    if stage == "cluster": return clustered
+
+    t0 = time.perf_counter()
+    stage_artifacts(df, clustered, out_dir, neighbors_k=neighbors_k, workers=workers, dense_matrix=dense_matrix)
+    print(f"[artifacts] ditulis ke {os.path.abspath(out_dir)} dalam {time.perf_counter() - t0:.1f}s")
+    if registry_dir:
+        from registry import publish
+        print(f"[registry] versi aktif: {publish(out_dir, registry_dir)['version']}")
+    return clustered
+
+
+def main():
+    p = argparse.ArgumentParser(description="Pipeline training offline (cleaning, RFM, KMeans, artefak dashboard).")
+    p.add_argument("--raw", required=True, help="online_retail_II.csv")
+    p.add_argument("--stage", choices=STAGES + ["all"], default="all", help="Jalankan sampai stage ini")
+    p.add_argument("--k", type=int, default=4, help="Jumlah cluster final")
+    p.add_argument("--k-min", type=int, default=2)
+    p.add_argument("--k-max", type=int, default=9)
+    p.add_argument("--workers", type=int, default=None, help="Jumlah proses untuk ingest, evaluasi k & similarity (default: semua core)")
+    p.add_argument("--silhouette-sample", type=int, default=10_000, help="Ukuran sampel Silhouette (0 = semua customer)")
+    p.add_argument("--minibatch", action="store_true", help="Pakai MiniBatchKMeans untuk customer dalam jumlah besar")
+    p.add_argument("--out", default=".", help="Folder output artefak")
+    p.add_argument("--neighbors-k", type=int, default=50, help="Jumlah tetangga per produk di item_neighbors")
+    p.add_argument("--dense-matrix", action="store_true", help="Tulis juga user_item_matrix.pkl dense (customer x produk; hindari untuk katalog besar)")
+    p.add_argument("--cache-dir", default=CACHE_DIR)
+    p.add_argument("--force", nargs="*", default=[], choices=STAGES, help="Abaikan cache untuk stage ini")
+    p.add_argument("--registry", default=None, help="Publish artefak sebagai versi baru di registry ini (mis. artifacts)")
+    args = p.parse_args()
+
+    run(args.raw, args.stage, k=args.k, k_values=range(args.k_min, args.k_max + 1), workers=args.workers,
+        silhouette_sample=args.silhouette_sample or None, minibatch=args.minibatch,
+        out_dir=args.out, cache_dir=args.cache_dir, force=args.force, registry_dir=args.registry,
+        neighbors_k=args.neighbors_k, dense_matrix=args.dense_matrix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Product Catalog Stats ---
+# Tabel per produk (index = Description) untuk kartu produk di dashboard:
+# harga rata-rata, total terjual, dan ranking best seller global.
+# PriceSum & PriceCount disimpan supaya tabel bisa digabung dengan batch baru.
+
+STATS_FILE = "product_stats.parquet"
+
+
+def _finalize(stats):
+    stats["UnitPrice"] = stats["PriceSum"] / stats["PriceCount"].replace(0, np.nan)
+    stats["Rank"] = stats["TotalQuantity"].rank(ascending=False, method="first").astype("int32")
+    return stats.sort_values("Rank")
+
+
+def build_product_stats(df_full):
+    df = df_full[["Description", "Quantity", "Revenue"]]
+    pos = df[df["Quantity"] > 0]
+    stats = pd.DataFrame({
+        "PriceSum": (pos["Revenue"] / pos["Quantity"]).groupby(pos["Description"], observed=True).sum(),
+        "PriceCount": pos.groupby("Description", observed=True).size(),
+        "Quantity": pos.groupby("Description", observed=True)["Quantity"].sum(),
+        "TotalQuantity": df.groupby("Description", observed=True)["Quantity"].sum(),
+    }).fillna(0)
+    stats.index = stats.index.astype(str).rename("Description")
+    stats = stats.astype({"PriceCount": "int64", "Quantity": "int64", "TotalQuantity": "int64"})
+    return _finalize(stats)
+
+
+def merge_product_stats(stats, other):
+    cols = ["PriceSum", "PriceCount", "Quantity", "TotalQuantity"]
+    merged = stats[cols].add(other[cols], fill_value=0)
+    return _finalize(merged.astype({"PriceCount": "int64", "Quantity": "int64", "TotalQuantity": "int64"}))
+
+
+def best_sellers(stats, n=5):
+    return stats.nsmallest(n, "Rank").index.tolist()
+
+
+def save_product_stats(stats, path=STATS_FILE):
+    stats.to_parquet(path)
+
+
+def load_product_stats(path=STATS_FILE):
+    return pd.read_parquet(path)
+
+
+def product_stats_available(path=STATS_FILE):
+    return os.path.isfile(path)
@@ -0,0 +1,238 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from customer_index import normalize_customer_id
+from item_neighbors import NEIGHBORS_DIR, load_or_build_item_neighbors
+from user_item import USER_ITEM_DIR, from_frame, load_or_build_user_item
+from vocab import VOCAB_DIR, load_vocabulary, same_products, vocabulary_available
+
+# --- Recommendation Engine ---
+# Logika rekomendasi yang dipakai bersama oleh dashboard, batch export, dan service.
+# Produk di jalur rekomendasi = kode kolom user_item_matrix; nama baru di-decode saat output.
+
+
+def load_models(base_dir="."):
+    # user_item_matrix & item_neighbors dibuka sebagai memory-mapped array (read-only),
+    # vocab dibuka sekali dan dipakai bersama keduanya (items = array yang sama, tanpa remap).
+    # Artefak tanpa vocab bersama di-align sekali di sini, bukan per request.
+    path = lambda name: os.path.join(base_dir, name)
+    vocab = load_vocabulary(path(VOCAB_DIR)) if vocabulary_available(path(VOCAB_DIR)) else None
+    user_item_matrix = load_or_build_user_item(path(USER_ITEM_DIR), vocab=vocab)
+    item_neighbors = load_or_build_item_neighbors(path(NEIGHBORS_DIR), vocab=vocab).aligned(user_item_matrix.items)
+    item_neighbors.to_sparse()
+    with open(path("topN_cluster.pkl"), "rb") as f:
+        topN_cluster = pickle.load(f)
+    return encode_top_cluster(topN_cluster, user_item_matrix.items, vocab), user_item_matrix, item_neighbors
+
+
+def encode_top_cluster(top_cluster_df, items, vocab=None):
+    # Kolom Item = kode kolom user_item_matrix. Artefak lama / incremental.py masih menyimpan
+    # Description -> di-encode sekali saat load; kode vocab di-remap bila urutan produk berbeda.
+    if "Item" in top_cluster_df.columns:
+        if vocab is None or same_products(vocab.products, items): return top_cluster_df
+        names = vocab.products[top_cluster_df["Item"].to_numpy()]
+    elif "Description" in top_cluster_df.columns: names = top_cluster_df["Description"]
+    else: return top_cluster_df
+    codes = pd.Index(np.asarray(items).astype(str)).get_indexer(np.asarray(names).astype(str)).astype(np.int32)
+    return top_cluster_df.assign(Item=codes)[codes >= 0]
+
+
+def cluster_items(top_cluster_df, cluster, n=5):
+    # Kode produk top cluster (urutan Quantity desc seperti di topN_cluster)
+    return top_cluster_df.loc[top_cluster_df["Cluster"] == cluster, "Item"].to_numpy(dtype=np.int32)[:n]
+
+
+def health_status(recency):
+    # Status kesehatan customer berdasarkan Recency (hari)
+    if recency <= 30: return "Active 🟢", "green"
+    elif recency <= 90: return "Warning 🟡", "orange"
+    else: return "Churn Risk 🔴", "red"
+
+
+# --- Basket-based CF ---
+# Skor kandidat = vektor pembelian customer (bobot Quantity) x matriks similarity sparse,
+# sehingga seluruh riwayat belanja ikut menentukan, bukan hanya satu produk terakhir.
+CF_MODES = ["basket", "last_item"]
+
+
+def top_n_per_row(scores, exclude=None, n=5):
+    # Top-n kolom per baris matriks sparse (vectorized, tanpa loop per customer)
+    scores = sparse.csr_matrix(scores)
+    if exclude is not None:
+        scores = scores - scores.multiply(exclude > 0)
+        scores.eliminate_zeros()
+    out = np.full((scores.shape[0], n), -1, dtype=np.int32)
+    if scores.nnz == 0: return out
+    rows = np.repeat(np.arange(scores.shape[0]), np.diff(scores.indptr))
+    order = np.lexsort((-scores.data, rows))
+    rank = np.arange(len(order)) - scores.indptr[rows[order]]
+    keep = rank < n
+    out[rows[order][keep], rank[keep]] = scores.indices[order][keep]
+    return out
+
+
+def basket_scores(quantities, item_sim):
+    # quantities: (customer x produk), item_sim: (produk x produk) -> (customer x produk)
+    return sparse.csr_matrix(quantities, dtype=np.float32) @ item_sim
+
+
+def basket_similar(items, quantities, item_nbrs, n=5, codes=None):
+    # Versi satu customer: items = produk yang dibeli, quantities = jumlahnya
+    # (codes = kode item_nbrs bila sudah diketahui, lewati lookup nama)
+    if codes is None: codes = item_nbrs.get_indexer(items)
+    keep = codes >= 0
+    codes = codes[keep]
+    if len(codes) == 0: return []
+    u = sparse.csr_matrix((np.asarray(quantities, dtype=np.float32)[keep], (np.zeros(len(codes), dtype=np.int32), codes)), shape=(1, len(item_nbrs)))
+    top = top_n_per_row(basket_scores(u, item_nbrs.to_sparse()), exclude=u, n=n)[0]
+    return item_nbrs.items[top[top >= 0]].tolist()
+
+
+def recommend_products(customer_id, cust_idx, top_cluster_df, user_matrix, item_nbrs, n=5, cf_mode="basket"):
+    # Input dari load_models: topN sudah ber-kolom Item, item_nbrs sudah di-align ke user_matrix.items
+    cid = normalize_customer_id(customer_id)
+    r = cust_idx.rfm_row(cid)
+    if r < 0: return None, f"ID {customer_id} tidak ditemukan."
+
+    m = cust_idx.matrix_row(cid)
+    if m < 0: return None, f"ID {customer_id} tidak memiliki transaksi."
+
+    cluster = int(cust_idx.cluster[r])
+
+    cluster_codes = cluster_items(top_cluster_df, cluster, n)
+
+    codes, quantities = user_matrix.row(m)
+    items = user_matrix.items
+    shared = item_nbrs.items is items  # O(1); selain itu lookup per nama produk yang dibeli saja
+
+    similar_items = []
+    if len(codes) > 0 and cf_mode == "basket":
+        similar_items = basket_similar(None if shared else items[codes], quantities, item_nbrs, n, codes if shared else None)
+    elif len(codes) > 0:
+        similar_items = item_nbrs.similar(str(items[codes[-1]]), n)
+
+    not_bought = cluster_codes[~np.isin(cluster_codes, codes)][:n]
+
+    return {
+        "Cluster": int(cluster),
+        "Top Cluster Products": items[cluster_codes].tolist(),
+        "Similar Products (CF)": similar_items,
+        "Cluster Products Not Bought": items[not_bought].tolist(),
+        "Bought List": items[codes].tolist()
+    }, None
+
+
+# --- Batch Mode ---
+# Versi vectorized dari recommend_products untuk banyak customer sekaligus.
+# Semua produk direpresentasikan sebagai kode kolom user_item_matrix (-1 = kosong).
+
+STATUS_OK, STATUS_NOT_FOUND, STATUS_NO_TRX = 0, 1, 2
+STATUS_LABEL = {STATUS_OK: "ok", STATUS_NOT_FOUND: "not_found", STATUS_NO_TRX: "no_transactions"}
+RESULT_LISTS = ["Top Cluster Products", "Similar Products (CF)", "Cluster Products Not Bought"]
+
+
+class BatchRecommender:
+    def __init__(self, cust_idx, top_cluster_df, user_matrix, item_nbrs, n=5, cf_mode="basket"):
+        self.cust_idx = cust_idx
+        self.n = n
+        self.cf_mode = cf_mode
+        if isinstance(user_matrix, pd.DataFrame): user_matrix = from_frame(user_matrix)
+        self.items = np.asarray(user_matrix.items).astype(str)
+
+        # Quantity per (customer, produk) dalam sparse + item terakhir per customer (urutan kolom, sama seperti bought_items[-1])
+        self.quantities = user_matrix.tocsr()
+        nnz = np.diff(self.quantities.indptr)
+        self.last_item = np.full(self.quantities.shape[0], -1, dtype=np.int32)
+        self.last_item[nnz > 0] = self.quantities.indices[self.quantities.indptr[1:][nnz > 0] - 1]
+
+        # Top produk per cluster -> (n_cluster, n) kode produk
+        top_cluster_df = encode_top_cluster(top_cluster_df, user_matrix.items)
+        n_clusters = int(max(top_cluster_df["Cluster"].max(), cust_idx.cluster.max())) + 1
+        self.cluster_picks = np.full((n_clusters, n), -1, dtype=np.int32)
+        for c, grp in top_cluster_df.groupby("Cluster"):
+            codes = grp["Item"].to_numpy(dtype=np.int32)[:n]
+            self.cluster_picks[int(c), :len(codes)] = codes
+
+        # Tetangga CF dipetakan ke kode kolom user_item_matrix (identitas bila vocab sama)
+        if same_products(item_nbrs.items, user_matrix.items):
+            nbr_to_item = item_to_nbr = np.arange(len(self.items), dtype=np.int32)
+            self.item_sim = item_nbrs.to_sparse()
+        else:
+            nbr_to_item = pd.Index(self.items).get_indexer(item_nbrs.items.astype(str)).astype(np.int32)
+            item_to_nbr = item_nbrs.get_indexer(self.items)
+            self.item_sim = item_nbrs.to_sparse(self.items)
+        nbr_idx = item_nbrs.neighbor_idx[:, :n]
+        nbr_codes = np.where(nbr_idx >= 0, nbr_to_item[np.maximum(nbr_idx, 0)], -1)
+        self.similar = np.full((len(self.items), n), -1, dtype=np.int32)
+        has_nbr = item_to_nbr >= 0
+        self.similar[has_nbr, :nbr_codes.shape[1]] = nbr_codes[item_to_nbr[has_nbr]]
+
+    def recommend(self, customer_ids):
+        ids = np.asarray(customer_ids, dtype=np.int64)
+        rows = self.cust_idx.rows.get_many(ids)
+        mrows = self.cust_idx.matrix.get_many(ids) if self.cust_idx.matrix is not None else np.full(len(ids), -1, np.int32)
+
+        status = np.full(len(ids), STATUS_OK, dtype=np.int8)
+        status[mrows < 0] = STATUS_NO_TRX
+        status[rows < 0] = STATUS_NOT_FOUND
+        ok = status == STATUS_OK
+
+        clusters = np.full(len(ids), -1, dtype=np.int16)
+        clusters[ok] = self.cust_idx.cluster[rows[ok]]
+
+        empty = np.full((len(ids), self.n), -1, dtype=np.int32)
+        picks, similar, not_bought = empty.copy(), empty.copy(), empty.copy()
+        picks[ok] = self.cluster_picks[clusters[ok]]
+
+        if self.cf_mode == "basket":
+            # Satu sparse matrix-matrix product untuk seluruh chunk customer
+            q = self.quantities[mrows[ok]]
+            similar[ok] = top_n_per_row(basket_scores(q, self.item_sim), exclude=q, n=self.n)
+        else:
+            last = np.full(len(ids), -1, dtype=np.int32)
+            last[ok] = self.last_item[mrows[ok]]
+            has_last = last >= 0
+            similar[has_last] = self.similar[last[has_last]]
+
+        # "Not bought": lookup sparse untuk semua pasangan (customer, pick) sekaligus
+        pr, pc = np.nonzero(picks >= 0)
+        bought = np.zeros(picks.shape, dtype=bool)
+        if len(pr):
+            bought[pr, pc] = np.asarray(self.quantities[mrows[pr], picks[pr, pc]]).ravel() > 0
+        keep = (picks >= 0) & ~bought
+        order = np.argsort(~keep, axis=1, kind="stable")
+        not_bought = np.where(np.take_along_axis(keep, order, axis=1), np.take_along_axis(picks, order, axis=1), -1)
+
+        return {
+            "Customer ID": ids,
+            "Status": status,
+            "Cluster": clusters,
+            "Top Cluster Products": picks,
+            "Similar Products (CF)": similar,
+            "Cluster Products Not Bought": not_bought,
+        }
+
+    def decode(self, codes):
+        # Kode produk -> list nama (per baris), hanya saat output
+        names = self.items[np.maximum(codes, 0)]
+        return [row[c >= 0].tolist() for row, c in zip(names, codes)]
+
+    def to_frame(self, result, sep=None):
+        out = pd.DataFrame({
+            "Customer ID": result["Customer ID"],
+            "Status": [STATUS_LABEL[s] for s in result["Status"].tolist()],
+            "Cluster": result["Cluster"],
+        })
+        for col in RESULT_LISTS:
+            lists = self.decode(result[col])
+            out[col] = [sep.join(x) for x in lists] if sep is not None else lists
+        return out
+
+
+def recommend_batch(customer_ids, cust_idx, top_cluster_df, user_matrix, item_nbrs, n=5, cf_mode="basket"):
+    batch = BatchRecommender(cust_idx, top_cluster_df, user_matrix, item_nbrs, n=n, cf_mode=cf_mode)
+    return batch.to_frame(batch.recommend(customer_ids))
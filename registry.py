@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+# --- Versioned Artifact Registry ---
+# Setiap build artefak (pipeline / incremental) dipublish sebagai satu folder versi yang
+# tidak pernah diubah lagi, lengkap dengan manifest.json (versi, waktu build, sha256 & ukuran
+# tiap file). File CURRENT menunjuk versi aktif dan diganti secara atomic (tmp + rename),
+# sehingga pembaca selalu melihat satu build utuh, tidak pernah campuran dua build.
+#
+#   artifacts/
+#     CURRENT                       # "20261016T120000-3f2a9c1b"
+#     versions/<version>/manifest.json, rfm.pkl, user_item/, df_full_parquet/, ...
+#
+#   python registry.py publish .                 # publish artefak di folder kerja
+#   python registry.py list
+#   python registry.py activate <version>        # rollback / pin versi
+#   python registry.py verify                    # cek checksum versi aktif
+#   python registry.py prune --keep 3
+
+REGISTRY_DIR = "artifacts"
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_SCHEMA = 1
+
+# File / folder yang membentuk satu build dashboard
+ARTIFACT_FILES = [
+    "rfm.pkl", "topN_cluster.pkl", "user_item_matrix.pkl", "user_item", "item_neighbors",
+    "item_similarity_df.pkl", "df_full_parquet", "df_full.csv", "rollup", "product_stats.parquet",
+    "cluster_profiles.json", "rfm_history", "cluster_model.pkl", "rfm_state.pkl", "vocab",
+]
+REQUIRED_FILES = ["rfm.pkl", "topN_cluster.pkl"]
+# Kolom minimum yang diharapkan pembaca (dicek saat artefak dimuat)
+REQUIRED_COLUMNS = {
+    "rfm": ["Customer ID", "Recency", "Frequency", "Monetary", "Cluster"],
+    "topN_cluster": ["Cluster", "Item", "Quantity"],  # Item = kode produk (load_models)
+    "transactions": ["Invoice", "Customer ID", "Description", "Quantity", "Revenue", "Country", "YearMonth", "Cluster"],
+}
+CHUNK = 1 << 20
+
+
+class ArtifactError(Exception):
+    pass
+
+
+# --- Checksum & Schema ---
+def _files(path):
+    # Semua file di bawah path (file tunggal atau folder), path relatif dengan "/"
+    if os.path.isfile(path): return [os.path.basename(path)]
+    base = os.path.dirname(path.rstrip("/\\"))
+    out = []
+    for root, _, names in os.walk(path):
+        out += [os.path.relpath(os.path.join(root, n), base).replace(os.sep, "/") for n in names]
+    return sorted(out)
+
+
+def sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""): h.update(block)
+    return h.hexdigest()
+
+
+def check_columns(name, df):
+    missing = [c for c in REQUIRED_COLUMNS.get(name, []) if c not in df.columns]
+    if missing: raise ArtifactError(f"{name}: kolom tidak ada {missing}")
+    return df
+
+
+# --- Manifest ---
+def build_manifest(src_dir, names=ARTIFACT_FILES):
+    files = {}
+    for name in names:
+        path = os.path.join(src_dir, name)
+        if not os.path.exists(path): continue
+        for rel in _files(path):
+            full = os.path.join(src_dir, rel)
+            files[rel] = {"sha256": sha256(full), "bytes": os.path.getsize(full)}
+    missing = [n for n in REQUIRED_FILES if n not in files]
+    if missing: raise ArtifactError(f"Artefak wajib tidak ditemukan di {src_dir}: {missing}")
+    digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:8]
+    built_at = pd.Timestamp.now()
+    return {
+        "schema": MANIFEST_SCHEMA,
+        "version": f"{built_at:%Y%m%dT%H%M%S}-{digest}",
+        "built_at": built_at.isoformat(timespec="seconds"),
+        "files": files,
+    }
+
+
+def load_manifest(version_dir):
+    try:
+        with open(os.path.join(version_dir, MANIFEST_FILE)) as f: manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Manifest tidak terbaca di {version_dir}: {e}") from e
+    if manifest.get("schema") != MANIFEST_SCHEMA:
+        raise ArtifactError(f"Schema manifest {manifest.get('schema')} tidak didukung (butuh {MANIFEST_SCHEMA})")
+    return manifest
+
+
+def verify(version_dir, manifest=None, checksums=True):
+    # Ukuran + sha256 tiap file harus sama dengan manifest (checksums=False: ukuran saja, cepat)
+    manifest = manifest or load_manifest(version_dir)
+    for rel, meta in manifest["files"].items():
+        path = os.path.join(version_dir, rel)
+        if not os.path.isfile(path): raise ArtifactError(f"{manifest['version']}: file hilang {rel}")
+        if os.path.getsize(path) != meta["bytes"] or (checksums and sha256(path) != meta["sha256"]):
+            raise ArtifactError(f"{manifest['version']}: checksum tidak cocok {rel}")
+    return manifest
+
+
+# --- Registry ---
+def version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, VERSIONS_DIR, version)
+
+
+def is_published(path):
+    # True bila path berada di folder versi registry (immutable; tidak boleh ditulis)
+    return os.path.isfile(os.path.join(os.path.dirname(os.path.abspath(path)), MANIFEST_FILE))
+
+
+def registry_available(registry_dir=REGISTRY_DIR):
+    return os.path.isfile(os.path.join(registry_dir, CURRENT_FILE))
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f: return f.read().strip() or None
+    except OSError: return None
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    root = os.path.join(registry_dir, VERSIONS_DIR)
+    if not os.path.isdir(root): return []
+    return sorted(v for v in os.listdir(root) if os.path.isfile(os.path.join(root, v, MANIFEST_FILE)))
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    # Ganti pointer CURRENT secara atomic; pembaca lama tetap memakai folder versinya
+    load_manifest(version_dir(version, registry_dir))
+    tmp = os.path.join(registry_dir, f"{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w") as f: f.write(version + "\n")
+    os.replace(tmp, os.path.join(registry_dir, CURRENT_FILE))
+    return version
+
+
+def publish(src_dir=".", registry_dir=REGISTRY_DIR, names=ARTIFACT_FILES, make_current=True):
+    # Salin artefak ke folder versi baru (tmp + rename), tulis manifest, lalu aktifkan
+    manifest = build_manifest(src_dir, names)
+    root = os.path.join(registry_dir, VERSIONS_DIR)
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, f".{manifest['version']}.{uuid.uuid4().hex}.tmp")
+    try:
+        for name in names:
+            src = os.path.join(src_dir, name)
+            if os.path.isdir(src): shutil.copytree(src, os.path.join(tmp, name))
+            elif os.path.isfile(src):
+                os.makedirs(tmp, exist_ok=True)
+                shutil.copy2(src, os.path.join(tmp, name))
+        with open(os.path.join(tmp, MANIFEST_FILE), "w") as f: json.dump(manifest, f, indent=2)
+        verify(tmp, manifest)
+        os.replace(tmp, version_dir(manifest["version"], registry_dir))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if make_current: activate(manifest["version"], registry_dir)
+    return manifest
+
+
+def prune(registry_dir=REGISTRY_DIR, keep=3):
+    # Hapus versi lama selain `keep` terbaru & versi aktif (mmap yang masih terbuka tetap valid di Linux)
+    current = current_version(registry_dir)
+    versions = list_versions(registry_dir)
+    old = [v for v in versions[:max(len(versions) - keep, 0)] if v != current]
+    for v in old: shutil.rmtree(version_dir(v, registry_dir), ignore_errors=True)
+    return old
+
+
+# --- CLI ---
+def main():
+    p = argparse.ArgumentParser(description="Registry artefak ber-versi (publish, list, activate, verify, prune).")
+    p.add_argument("--registry", default=REGISTRY_DIR)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("publish", help="Publish artefak dari folder sebagai versi baru")
+    sp.add_argument("src", nargs="?", default=".")
+    sp.add_argument("--no-activate", action="store_true", help="Hanya simpan versi, CURRENT tidak diubah")
+    sub.add_parser("list", help="Daftar versi")
+    sa = sub.add_parser("activate", help="Jadikan versi ini aktif")
+    sa.add_argument("version")
+    sv = sub.add_parser("verify", help="Cek checksum (default: versi aktif)")
+    sv.add_argument("version", nargs="?", default=None)
+    sr = sub.add_parser("prune", help="Hapus versi lama")
+    sr.add_argument("--keep", type=int, default=3)
+    args = p.parse_args()
+
+    if args.cmd == "publish":
+        manifest = publish(args.src, args.registry, make_current=not args.no_activate)
+        print(f"[registry] {manifest['version']}: {len(manifest['files'])} file")
+    elif args.cmd == "list":
+        current = current_version(args.registry)
+        for v in list_versions(args.registry): print(("* " if v == current else "  ") + v)
+    elif args.cmd == "activate":
+        print(f"[registry] aktif: {activate(args.version, args.registry)}")
+    elif args.cmd == "verify":
+        version = args.version or current_version(args.registry)
+        if version is None: raise SystemExit("Registry belum memiliki versi aktif.")
+        verify(version_dir(version, args.registry))
+        print(f"[registry] {version}: OK")
+    elif args.cmd == "prune":
+        print(f"[registry] dihapus: {', '.join(prune(args.registry, args.keep)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# --- As-of RFM Index ---
+# Invoice tiap customer (tanggal + revenue) disusun urut (customer, tanggal) dalam satu array,
+# dengan key int64 = rank customer << 32 | detik sejak tanggal pertama, plus prefix sum revenue.
+# RFM untuk tanggal acuan / jendela waktu apa pun cukup dua searchsorted per customer:
+#   Frequency = hi - lo, Monetary = cum[hi] - cum[lo], Recency = acuan - tanggal invoice ke-(hi-1).
+# Semantik sama dengan pipeline: hanya transaksi < reference_date, Recency dalam hari penuh.
+# Disimpan sebagai .npy tanpa kompresi (mmap, dibagi antar session seperti user_item).
+# Batch baru (incremental.py) di-merge ke index yang ada: searchsorted + insert, prefix sum hanya
+# dihitung ulang mulai posisi sisipan pertama; tanpa scan histori transaksi.
+#
+#   python rfm_history.py --as-of 2011-06-30 --window-days 90 --out rfm_2011-06-30.csv
+
+HISTORY_DIR = "rfm_history"
+HISTORY_COLUMNS = ["Invoice", "InvoiceDate", "Customer ID", "Revenue"]
+ARRAYS = ["customer_ids", "offsets", "keys", "cum_revenue", "meta"]
+SHIFT = 32
+MAX_REL = (1 << SHIFT) - 1
+
+
+class RFMHistory:
+    def __init__(self, customer_ids, offsets, keys, cum_revenue, meta):
+        self.customer_ids = customer_ids  # int64, urut naik
+        self.offsets = offsets            # posisi awal invoice tiap customer (len n + 1)
+        self.keys = keys                  # rank << 32 | detik relatif, urut naik
+        self.cum_revenue = cum_revenue    # prefix sum revenue (len invoice + 1)
+        self.meta = meta                  # [t0, reference_date default] dalam detik epoch
+
+    @property
+    def t0(self):
+        return int(self.meta[0])
+
+    @property
+    def reference_date(self):
+        # Default acuan = invoice terakhir + 1 hari (sama dengan rfm.pkl)
+        return pd.Timestamp(int(self.meta[1]), unit="s")
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.t0, unit="s")
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+    def _query(self, ranks, ts):
+        rel = np.clip(int(pd.Timestamp(ts).value // 10**9) - self.t0, 0, MAX_REL)
+        return np.searchsorted(self.keys, (ranks.astype(np.int64) << SHIFT) | rel)
+
+    def _rfm(self, ranks, reference_date, start):
+        hi = self._query(ranks, reference_date)
+        lo = self._query(ranks, start) if start is not None else self.offsets[ranks]
+        active = hi > lo
+        ranks, lo, hi = ranks[active], lo[active], hi[active]
+        last = (self.keys[hi - 1] & MAX_REL) + self.t0
+        ref = int(pd.Timestamp(reference_date).value // 10**9)
+        return pd.DataFrame({
+            "Customer ID": self.customer_ids[ranks],
+            "Recency": ((ref - last) // 86_400).astype(np.int64),
+            "Frequency": (hi - lo).astype(np.int64),
+            "Monetary": self.cum_revenue[hi] - self.cum_revenue[lo],
+        })
+
+    def rfm(self, reference_date=None, start=None):
+        # Batch semua customer; customer tanpa invoice di [start, reference_date) tidak ikut
+        if reference_date is None: reference_date = self.reference_date
+        return self._rfm(np.arange(len(self), dtype=np.int64), reference_date, start)
+
+    def customer(self, cid, reference_date=None, start=None):
+        # Satu customer (O(log n)); None bila tidak ada invoice di jendela
+        r = np.searchsorted(self.customer_ids, cid)
+        if r >= len(self) or self.customer_ids[r] != cid: return None
+        if reference_date is None: reference_date = self.reference_date
+        out = self._rfm(np.array([r], dtype=np.int64), reference_date, start)
+        return out.iloc[0].to_dict() if len(out) else None
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+
+def _invoices(df):
+    # Satu baris per (customer, invoice): tanggal invoice + total revenue, urut (customer, tanggal)
+    inv = df[HISTORY_COLUMNS].groupby(["Customer ID", "Invoice"], observed=True, sort=False).agg(
+        InvoiceDate=("InvoiceDate", "max"), Revenue=("Revenue", "sum")).reset_index()
+    cids = inv["Customer ID"].to_numpy(dtype=np.int64)
+    secs = pd.to_datetime(inv["InvoiceDate"]).to_numpy(dtype="datetime64[s]").astype(np.int64)
+    order = np.lexsort((secs, cids))
+    return cids[order], secs[order], inv["Revenue"].to_numpy(dtype=np.float64)[order]
+
+
+def build_rfm_history(df):
+    cids, secs, revenue = _invoices(df)
+    customer_ids, ranks, counts = np.unique(cids, return_inverse=True, return_counts=True)
+    t0 = int(secs.min()) if len(secs) else 0
+    reference = int(secs.max()) + 86_400 if len(secs) else 0
+    return RFMHistory(
+        customer_ids,
+        np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        (ranks.astype(np.int64) << SHIFT) | (secs - t0),
+        np.concatenate([[0.0], np.cumsum(revenue)]),
+        np.array([t0, reference], dtype=np.int64),
+    )
+
+
+def merge_rfm_history(history, df, seen_invoices=None):
+    # Tambah invoice batch ke index yang ada (invoice bertanggal lampau ikut tersisip di posisinya).
+    # Invoice yang sudah ada di index (seen_invoices: array str terurut) dibuang supaya tidak dihitung
+    # dua kali; invoice yang sama di beberapa baris batch digabung seperti build.
+    if seen_invoices is not None and len(df) and len(seen_invoices):
+        inv = df["Invoice"].astype(str).to_numpy()
+        pos = np.clip(np.searchsorted(seen_invoices, inv), 0, len(seen_invoices) - 1)
+        df = df.loc[seen_invoices[pos] != inv]
+    cids, secs, revenue = _invoices(df)
+    if not len(cids): return history
+    if not len(history): return build_rfm_history(df)
+
+    # t0 mundur (invoice sebelum tanggal pertama) -> semua detik relatif digeser
+    t0 = min(history.t0, int(secs.min()))
+    ranks_old = history.keys >> SHIFT
+    rel_old = (history.keys & MAX_REL) + (history.t0 - t0)
+
+    # Customer baru disisipkan ke customer_ids terurut; rank customer lama bergeser sebanyak
+    # customer baru yang lebih kecil darinya
+    new_ids = np.unique(cids[~np.isin(cids, history.customer_ids)])
+    customer_ids = np.insert(history.customer_ids, np.searchsorted(history.customer_ids, new_ids), new_ids)
+    if len(new_ids): ranks_old = ranks_old + np.searchsorted(new_ids, history.customer_ids)[ranks_old]
+    keys_old = (ranks_old << SHIFT) | rel_old
+
+    keys_new = (np.searchsorted(customer_ids, cids).astype(np.int64) << SHIFT) | (secs - t0)
+    pos = np.searchsorted(keys_old, keys_new, side="right")
+    keys = np.insert(keys_old, pos, keys_new)
+
+    # Prefix sum hanya dihitung ulang dari posisi sisipan pertama
+    first = int(pos.min())
+    revenue_all = np.insert(np.diff(history.cum_revenue), pos, revenue)
+    cum_revenue = np.empty(len(keys) + 1, dtype=np.float64)
+    cum_revenue[:first + 1] = history.cum_revenue[:first + 1]
+    cum_revenue[first + 1:] = history.cum_revenue[first] + np.cumsum(revenue_all[first:])
+
+    offsets = np.searchsorted(keys, np.arange(len(customer_ids) + 1, dtype=np.int64) << SHIFT).astype(np.int64)
+    reference = max(int(history.meta[1]), int(secs.max()) + 86_400)
+    return RFMHistory(customer_ids, offsets, keys, cum_revenue, np.array([t0, reference], dtype=np.int64))
+
+
+def save_rfm_history(history, path=HISTORY_DIR):
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), getattr(history, name))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def load_rfm_history(path=HISTORY_DIR, mmap=True):
+    mode = "r" if mmap else None
+    return RFMHistory(*[np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS])
+
+
+def rfm_history_available(path=HISTORY_DIR):
+    return os.path.isdir(path)
+
+
+def segment_mix(rfm, model):
+    # Cluster untuk RFM as-of dengan scaler + KMeans tersimpan (cluster_model.pkl)
+    from incremental import assign_clusters
+    out = rfm.copy()
+    out["Cluster"] = assign_clusters(model, out[["Recency", "Frequency", "Monetary"]].to_numpy()) if len(out) else []
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="RFM semua customer per tanggal acuan / jendela waktu.")
+    p.add_argument("--history", default=HISTORY_DIR)
+    p.add_argument("--as-of", default=None, help="Tanggal acuan (inklusif, YYYY-MM-DD); default: invoice terakhir")
+    p.add_argument("--window-days", type=int, default=None, help="Hanya invoice N hari terakhir sebelum acuan")
+    p.add_argument("--clusters", action="store_true", help="Tambah kolom Cluster dari cluster_model.pkl")
+    p.add_argument("--out", required=True, help="File CSV / Parquet output")
+    args = p.parse_args()
+
+    history = load_rfm_history(args.history)
+    reference = pd.Timestamp(args.as_of) + pd.Timedelta(days=1) if args.as_of else history.reference_date
+    start = reference - pd.Timedelta(days=args.window_days) if args.window_days else None
+    rfm = history.rfm(reference, start)
+    if args.clusters:
+        from incremental import load_cluster_model
+        rfm = segment_mix(rfm, load_cluster_model())
+    if args.out.endswith(".parquet"): rfm.to_parquet(args.out, index=False)
+    else: rfm.to_csv(args.out, index=False)
+    print(f"[rfm_history] {len(rfm):,} customer aktif per {reference:%Y-%m-%d} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Rollup Cube untuk halaman Dashboard EDA ---
+# Agregasi dibangun sekali saat save artefak, dengan key (Country, YearMonth, Cluster).
+# Setiap kombinasi filter sidebar cukup memilih sel cube lalu menjumlahkannya,
+# tanpa scan ulang baris transaksi mentah.
+
+ROLLUP_DIR = "rollup"
+CELL_KEYS = ["Country", "YearMonth", "Cluster"]
+
+
+class RollupCube:
+    def __init__(self, cells, products, customers):
+        self.cells = cells          # key -> Revenue, Transactions
+        self.products = products    # key + Description -> Quantity
+        self.customers = customers  # key + Customer ID -> Revenue
+
+    @property
+    def countries(self):
+        return sorted(self.cells["Country"].unique().tolist())
+
+    @property
+    def months(self):
+        return sorted(self.cells["YearMonth"].unique().tolist())
+
+    @property
+    def clusters(self):
+        return sorted(self.cells["Cluster"].unique().tolist())
+
+    def _mask(self, df, countries, months, clusters):
+        mask = np.ones(len(df), dtype=bool)
+        if countries: mask &= df["Country"].isin(countries).to_numpy()
+        if months: mask &= df["YearMonth"].isin([str(m) for m in months]).to_numpy()
+        if clusters: mask &= df["Cluster"].isin([int(c) for c in clusters]).to_numpy()
+        return mask
+
+    def summarize(self, countries=None, months=None, clusters=None, top_n=10):
+        cells = self.cells[self._mask(self.cells, countries, months, clusters)]
+        products = self.products[self._mask(self.products, countries, months, clusters)]
+        customers = self.customers[self._mask(self.customers, countries, months, clusters)]
+
+        cust_rev = customers.groupby("Customer ID")["Revenue"].sum()
+        cust_cluster = customers.drop_duplicates("Customer ID")["Cluster"]
+        prod_qty = products.groupby("Description", observed=True)["Quantity"].sum()
+        return {
+            "total_rev": float(cells["Revenue"].sum()),
+            "total_trx": int(cells["Transactions"].sum()),
+            "active_cust": int(cust_rev.shape[0]),
+            "unique_prod": int(prod_qty.shape[0]),
+            "rev_trend": cells.groupby("YearMonth", observed=True)["Revenue"].sum(),
+            "cluster_dist": cust_cluster.value_counts().sort_index(),
+            "top_products": prod_qty.sort_values(ascending=False).head(top_n),
+            "top_customers": cust_rev.sort_values(ascending=False).head(top_n),
+            "active_customers": cust_rev.index.to_numpy(),
+        }
+
+
+def _keys(df):
+    out = df.copy()
+    out["Country"] = out["Country"].astype(str).astype("category")
+    out["YearMonth"] = out["YearMonth"].astype(str).astype("category")
+    out["Cluster"] = out["Cluster"].astype("int8")
+    return out
+
+
+def build_rollup(df_full):
+    df = _keys(df_full[CELL_KEYS + ["Customer ID", "Description", "Quantity", "Revenue"]])
+    cells = (
+        df.groupby(CELL_KEYS, observed=True)
+        .agg(Revenue=("Revenue", "sum"), Transactions=("Revenue", "size"))
+        .reset_index()
+    )
+    products = df.groupby(CELL_KEYS + ["Description"], observed=True)["Quantity"].sum().reset_index()
+    customers = df.groupby(CELL_KEYS + ["Customer ID"], observed=True)["Revenue"].sum().reset_index()
+    products["Description"] = products["Description"].astype("category")
+    customers["Customer ID"] = customers["Customer ID"].astype("int64")
+    return RollupCube(_keys(cells), _keys(products), _keys(customers))
+
+
+def merge_rollup(cube, other):
+    # Gabungkan dua cube (mis. cube lama + cube dari batch transaksi baru)
+    def _merge(a, b, keys, values):
+        both = pd.concat([a.astype({k: "object" for k in keys}), b.astype({k: "object" for k in keys})], ignore_index=True)
+        return _keys(both.groupby(keys, observed=True)[values].sum().reset_index())
+    cells = _merge(cube.cells, other.cells, CELL_KEYS, ["Revenue", "Transactions"])
+    products = _merge(cube.products, other.products, CELL_KEYS + ["Description"], ["Quantity"])
+    customers = _merge(cube.customers, other.customers, CELL_KEYS + ["Customer ID"], ["Revenue"])
+    products["Description"] = products["Description"].astype("category")
+    return RollupCube(cells, products, customers)
+
+
+def save_rollup(cube, path=ROLLUP_DIR):
+    os.makedirs(path, exist_ok=True)
+    cube.cells.to_parquet(os.path.join(path, "cells.parquet"), index=False)
+    cube.products.to_parquet(os.path.join(path, "products.parquet"), index=False)
+    cube.customers.to_parquet(os.path.join(path, "customers.parquet"), index=False)
+
+
+def load_rollup(path=ROLLUP_DIR):
+    return RollupCube(
+        _keys(pd.read_parquet(os.path.join(path, "cells.parquet"))),
+        _keys(pd.read_parquet(os.path.join(path, "products.parquet"))),
+        _keys(pd.read_parquet(os.path.join(path, "customers.parquet"))),
+    )
+
+
+def rollup_available(path=ROLLUP_DIR):
+    return os.path.isfile(os.path.join(path, "cells.parquet"))
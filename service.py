@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+import numpy as np
+
+import perf
+from customer_index import normalize_customer_id
+from recommender import BatchRecommender, RESULT_LISTS, STATUS_LABEL, STATUS_OK, health_status
+from registry import REGISTRY_DIR, ArtifactError
+from store import LiveStore
+
+# --- Headless Recommendation Service (ASGI) ---
+# Output sama dengan halaman Customer Recommendation, dalam bentuk JSON.
+# Model di-load sekali saat startup; request yang datang bersamaan digabung
+# (micro-batch) menjadi satu lookup vectorized di BatchRecommender.
+# Versi artefak baru di registry dimuat di background; BatchRecommender baru ditukar
+# atomic, request yang sedang berjalan tetap memakai batch lamanya.
+#
+#   uvicorn service:app --host 0.0.0.0 --port 8000
+#   GET  /health
+#   GET  /metrics  (format teks Prometheus)
+#   GET  /recommend?customer_id=12346&n=5
+#   POST /recommend   {"customer_ids": [12346, 12347], "n": 5}
+
+MAX_N = int(os.environ.get("RECO_MAX_N", 5))
+MAX_BATCH = int(os.environ.get("RECO_MAX_BATCH", 512))
+MAX_WAIT_MS = float(os.environ.get("RECO_MAX_WAIT_MS", 1.0))
+RELOAD_SECONDS = float(os.environ.get("RECO_RELOAD_SECONDS", 30))
+SERVICE_ARTIFACTS = ["rfm", "models", "customer_index"]
+
+
+@perf.timed_fn("service.build_payloads")
+def build_payloads(batch, ids, n=MAX_N):
+    # Hasil BatchRecommender -> list dict JSON (satu per customer)
+    res = batch.recommend(ids)
+    rows = batch.cust_idx.rows.get_many(res["Customer ID"])
+    lists = {col: batch.decode(res[col]) for col in RESULT_LISTS}
+    out = []
+    for i, cid in enumerate(res["Customer ID"].tolist()):
+        status = int(res["Status"][i])
+        if status != STATUS_OK:
+            msg = f"ID {cid} tidak ditemukan." if rows[i] < 0 else f"ID {cid} tidak memiliki transaksi."
+            out.append({"Customer ID": cid, "Status": STATUS_LABEL[status], "Error": msg})
+            continue
+        r = rows[i]
+        recency = float(batch.cust_idx.recency[r])
+        label, color = health_status(recency)
+        top = lists["Top Cluster Products"][i][:n]
+        out.append({
+            "Customer ID": cid,
+            "Status": STATUS_LABEL[status],
+            "Cluster": int(res["Cluster"][i]),
+            "Top Cluster Products": top,
+            "Similar Products (CF)": lists["Similar Products (CF)"][i][:n],
+            "Cluster Products Not Bought": [p for p in lists["Cluster Products Not Bought"][i] if p in top],
+            "RFM": {
+                "Recency": recency,
+                "Frequency": float(batch.cust_idx.frequency[r]),
+                "Monetary": float(batch.cust_idx.monetary[r]),
+            },
+            "Health": {"Status": label, "Color": color},
+        })
+    return out
+
+
+class MicroBatcher:
+    def __init__(self, batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.batch = batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try: await self.task
+            except asyncio.CancelledError: pass
+
+    async def submit(self, cid):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((cid, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            # Tunggu sebentar supaya request lain yang datang bersamaan ikut masuk batch
+            if self.max_wait > 0: await asyncio.sleep(self.max_wait)
+            while len(items) < self.max_batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+
+            try:
+                ids = np.array([cid for cid, _ in items], dtype=np.int64)
+                payloads = await loop.run_in_executor(None, build_payloads, self.batch, ids)
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done(): fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(items)
+            for (_, fut), payload in zip(items, payloads):
+                if not fut.done(): fut.set_result(payload)
+
+
+class RecommendationService:
+    def __init__(self, registry_dir=REGISTRY_DIR, base_dir=".", reload_seconds=RELOAD_SECONDS):
+        self.registry_dir = registry_dir
+        self.base_dir = base_dir
+        self.reload_seconds = reload_seconds
+        self.live = None
+        self.version = None
+        self.batch = None
+        self.batcher = None
+
+    def load(self):
+        self.live = LiveStore(self.registry_dir, self.base_dir, self.reload_seconds, warm=SERVICE_ARTIFACTS)
+        self.swap(self.live.snapshot())
+        self.live.on_swap(self.swap)
+        self.live.start()
+
+    def swap(self, store):
+        # Bangun BatchRecommender dari satu versi store, lalu tukar referensinya
+        topN_cluster, user_item_matrix, item_neighbors = store.models
+        if user_item_matrix is None: raise ArtifactError(f"Model tidak tersedia: {store.errors.get('models', '-')}")
+        cust_idx = store.customer_index
+        if cust_idx is None: raise ArtifactError(f"RFM tidak tersedia: {store.errors.get('rfm', store.errors.get('customer_index', '-'))}")
+        batch = BatchRecommender(cust_idx, topN_cluster, user_item_matrix, item_neighbors, n=MAX_N)
+        self.batch, self.version = batch, store.version
+        if self.batcher is not None: self.batcher.batch = batch
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.load)
+                    self.batcher = MicroBatcher(self.batch)
+                    self.batcher.start()
+                    await send({"type": "lifespan.startup.complete"})
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+            elif message["type"] == "lifespan.shutdown":
+                if self.batcher is not None: await self.batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope["method"], scope["path"].rstrip("/")
+        if self.batch is None:
+            return await _json(send, 503, {"Error": "Model belum siap."})
+
+        if method == "GET" and path == "/health":
+            batch = self.batch
+            return await _json(send, 200, {
+                "status": "ok",
+                "version": self.version,
+                "customers": len(batch.cust_idx.rows),
+                "products": len(batch.items),
+                "batches": self.batcher.batches,
+                "batched_requests": self.batcher.requests,
+                "reload_error": self.live.last_error,
+            })
+
+        if method == "GET" and path == "/metrics":
+            body = perf.REGISTRY.render_prometheus().encode()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/plain; version=0.0.4"), (b"content-length", str(len(body)).encode())]})
+            return await send({"type": "http.response.body", "body": body})
+
+        if path == "/recommend" and method == "GET":
+            query = parse_qs(scope.get("query_string", b"").decode())
+            cid = normalize_customer_id(query.get("customer_id", [None])[0])
+            n = _parse_n(query.get("n", [MAX_N])[0])
+            if cid is None or n is None:
+                return await _json(send, 400, {"Error": "customer_id dan n harus berupa angka."})
+            payload = _trim(await self.batcher.submit(cid), n)
+            return await _json(send, 200 if payload["Status"] == "ok" else 404, payload)
+
+        if path == "/recommend" and method == "POST":
+            try:
+                body = json.loads(await _read_body(receive) or b"{}")
+                if not isinstance(body.get("customer_ids", []), list): raise ValueError("customer_ids harus list")
+                ids = [normalize_customer_id(c) for c in body.get("customer_ids", [])]
+                n = _parse_n(body.get("n", MAX_N))
+            except (ValueError, TypeError, AttributeError):
+                return await _json(send, 400, {"Error": "Body JSON tidak valid."})
+            if n is None or any(c is None for c in ids):
+                return await _json(send, 400, {"Error": "customer_ids dan n harus berupa angka."})
+            # Request bulk sudah berupa batch, langsung dihitung tanpa antre
+            payloads = await asyncio.get_running_loop().run_in_executor(
+                None, build_payloads, self.batch, np.array(ids, dtype=np.int64), n)
+            return await _json(send, 200, {"results": payloads})
+
+        return await _json(send, 404, {"Error": "Endpoint tidak ditemukan."})
+
+
+def _parse_n(value):
+    try: n = int(value)
+    except (TypeError, ValueError): return None
+    return min(max(n, 1), MAX_N)
+
+
+def _trim(payload, n):
+    if payload["Status"] != "ok" or n >= MAX_N: return payload
+    top = payload["Top Cluster Products"][:n]
+    return {
+        **payload,
+        "Top Cluster Products": top,
+        "Similar Products (CF)": payload["Similar Products (CF)"][:n],
+        "Cluster Products Not Bought": [p for p in payload["Cluster Products Not Bought"] if p in top],
+    }
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"): return body
+
+
+async def _json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+app = RecommendationService()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    p = argparse.ArgumentParser(description="Recommendation service (ASGI).")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    args = p.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
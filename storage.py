@@ -0,0 +1,133 @@
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- Columnar Storage untuk df_full ---
+# df_full disimpan sebagai Parquet (zstd) yang dipartisi per Country/YearMonth.
+# Kolom berkardinalitas rendah di-dictionary-encode (-> category di pandas),
+# ID disimpan sebagai integer, sehingga dashboard tidak perlu parsing CSV
+# dan cukup membaca kolom + partisi yang dibutuhkan saja.
+
+DATA_DIR = "df_full_parquet"
+PARTITION_COLS = ["Country", "YearMonth"]
+CATEGORY_COLS = ["StockCode", "Description", "Country", "YearMonth"]
+COMPRESSION = "zstd"
+
+
+def prepare_transactions(df):
+    # Normalisasi tipe data sebelum ditulis
+    out = df.copy()
+    if "YearMonth" in out.columns:
+        out["YearMonth"] = out["YearMonth"].astype(str)
+    if "InvoiceDate" in out.columns:
+        out["InvoiceDate"] = pd.to_datetime(out["InvoiceDate"])
+    if "Date" in out.columns:
+        out["Date"] = pd.to_datetime(out["Date"]).dt.date
+    if "Customer ID" in out.columns:
+        out["Customer ID"] = pd.to_numeric(out["Customer ID"], errors="coerce").astype("int64")
+    if "Invoice" in out.columns:
+        inv = pd.to_numeric(out["Invoice"], errors="coerce")
+        out["Invoice"] = inv.astype("int64") if inv.notna().all() else out["Invoice"].astype(str).astype("category")
+    if "Cluster" in out.columns:
+        out["Cluster"] = out["Cluster"].astype("int8")
+    for col in ["Quantity", "Frequency"]:
+        if col in out.columns: out[col] = out[col].astype("int32")
+    for col in ["Price", "Revenue", "Monetary"]:
+        if col in out.columns: out[col] = out[col].astype("float64")
+    if "Recency" in out.columns:
+        out["Recency"] = out["Recency"].astype("int32")
+    for col in CATEGORY_COLS:
+        if col in out.columns: out[col] = out[col].astype("category")
+    return out
+
+
+def write_transactions(df, path=DATA_DIR):
+    # Tulis ke folder sementara lalu rename, supaya pembaca tidak melihat dataset setengah jadi
+    table = pa.Table.from_pandas(prepare_transactions(df), preserve_index=False)
+    tmp_path = path.rstrip("/\\") + ".tmp"
+    if os.path.exists(tmp_path): shutil.rmtree(tmp_path)
+    pq.write_to_dataset(
+        table, tmp_path,
+        partition_cols=PARTITION_COLS,
+        compression=COMPRESSION,
+        use_dictionary=True,
+        existing_data_behavior="delete_matching",
+    )
+    if os.path.exists(path): shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def append_transactions(df, path=DATA_DIR):
+    # Tambah file baru ke partisi yang ada (untuk update harian), tanpa menulis ulang histori
+    table = pa.Table.from_pandas(prepare_transactions(df), preserve_index=False)
+    pq.write_to_dataset(
+        table, path,
+        partition_cols=PARTITION_COLS,
+        compression=COMPRESSION,
+        use_dictionary=True,
+        basename_template="part-" + uuid.uuid4().hex + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def _dataset(path):
+    return ds.dataset(path, format="parquet", partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+
+
+def _build_filter(countries=None, months=None, clusters=None):
+    expr = None
+    for col, values in (("Country", countries), ("YearMonth", months), ("Cluster", clusters)):
+        if not values: continue
+        values = [int(v) for v in values] if col == "Cluster" else [str(v) for v in values]
+        cond = ds.field(col).isin(values)
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def read_transactions(path=DATA_DIR, columns=None, countries=None, months=None, clusters=None):
+    # Hanya kolom & partisi yang diminta yang dibaca (partition pruning + predicate pushdown).
+    # memory_map=True: halaman file dibaca lewat page cache OS yang dibagi antar proses.
+    if columns is not None:
+        names = _dataset(path).schema.names
+        columns = [c for c in columns if c in names]
+    dictionary_cols = [c for c in CATEGORY_COLS if c not in PARTITION_COLS and (columns is None or c in columns)]
+    table = pq.read_table(
+        path, columns=columns,
+        filters=_build_filter(countries, months, clusters),
+        memory_map=True,
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+        read_dictionary=dictionary_cols,
+    )
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def scan_transactions(path=DATA_DIR, columns=None, countries=None, months=None, clusters=None, batch_size=65_536):
+    # Iterator RecordBatch (filter yang sama dengan read_transactions): memori dibatasi satu batch
+    dataset = _dataset(path)
+    if columns is not None: columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_batches(columns=columns, filter=_build_filter(countries, months, clusters), batch_size=batch_size)
+
+
+def head_transactions(path=DATA_DIR, n=5, countries=None, months=None, clusters=None):
+    # n baris pertama hasil filter, berhenti membaca begitu n baris terkumpul
+    table = _dataset(path).head(n, filter=_build_filter(countries, months, clusters))
+    return table.to_pandas()
+
+
+def list_partitions(path=DATA_DIR):
+    # Nilai Country & YearMonth diambil dari nama folder partisi, tanpa membaca data
+    countries, months = set(), set()
+    for frag in _dataset(path).get_fragments():
+        keys = ds.get_partition_keys(frag.partition_expression)
+        if "Country" in keys: countries.add(keys["Country"])
+        if "YearMonth" in keys: months.add(keys["YearMonth"])
+    return sorted(countries), sorted(months)
+
+
+def storage_available(path=DATA_DIR):
+    return os.path.isdir(path)
@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+import warnings
+
+import pandas as pd
+
+from cluster_profiles import PROFILES_FILE, build_cluster_profiles, cluster_profiles_available, load_cluster_profiles
+from customer360 import rfm_stats, top_customers
+from customer_index import CustomerIndex, normalize_customer_ids
+from incremental import MODEL_FILE, load_cluster_model
+from perf import count_cache, timed
+from product_stats import STATS_FILE, build_product_stats, load_product_stats, product_stats_available
+from recommender import load_models
+from registry import REGISTRY_DIR, ArtifactError, check_columns, current_version, load_manifest, registry_available, verify, version_dir
+from rfm_history import HISTORY_COLUMNS, HISTORY_DIR, build_rfm_history, load_rfm_history, rfm_history_available
+from rollup import ROLLUP_DIR, build_rollup, load_rollup, rollup_available
+from storage import DATA_DIR, read_transactions, storage_available
+
+# --- Shared Artifact Store ---
+# Satu instance per proses (dashboard: st.cache_resource), dipakai bersama oleh semua session.
+# Tiap artefak dimuat sekali secara lazy saat pertama kali diminta halaman yang membutuhkannya,
+# lalu dibagikan apa adanya (tanpa pickle / copy per rerun). Array model dibuka memory-mapped
+# (read-only), sehingga beberapa worker juga berbagi page cache yang sama.
+# Semua objek di sini READ-ONLY: jangan di-mutate, buat copy bila perlu mengubah.
+#
+# Bila folder registry (artifacts/CURRENT) ada, LiveStore memuat versi aktif dan memantau
+# CURRENT: versi baru diverifikasi & dimuat di thread background, lalu ditukar atomic.
+# Pemanggil mengambil satu snapshot() per request, sehingga tidak pernah mencampur dua build.
+
+# Kolom df_full yang dipakai halaman Recommendation & Cluster Insight
+APP_COLUMNS = ["Invoice", "Customer ID", "Description", "Quantity", "Revenue", "Country", "YearMonth", "Cluster"]
+
+
+class ArtifactStore:
+    def __init__(self, base_dir=".", version=None, strict=False):
+        self.base_dir = base_dir
+        self.version = version  # None = folder kerja tanpa registry
+        self.strict = strict    # True: artefak rusak -> ArtifactError (versi ditolak), bukan fallback kosong
+        self.errors = {}
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.base_dir, name)
+
+    @property
+    def data_dir(self):
+        return self._path(DATA_DIR)
+
+    def _fail(self, name, error, fallback):
+        # Catat error load (panel diagnostik), lalu fallback kosong; mode strict meneruskan error
+        self.errors[name] = f"{type(error).__name__}: {error}"
+        if self.strict: raise ArtifactError(f"{self.version or self.base_dir}: gagal memuat {name} ({error})") from error
+        warnings.warn(f"Artefak {name} gagal dimuat: {error}")
+        return fallback
+
+    def _get(self, name, loader):
+        if name in self._values:
+            count_cache(f"store.{name}", hit=True)
+            return self._values[name]
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # Lock per artefak: session lain menunggu load yang sama, bukan memuat ulang
+        with lock:
+            hit = name in self._values
+            if not hit:
+                with timed(f"load.{name}"): self._values[name] = loader()
+        count_cache(f"store.{name}", hit)
+        return self._values[name]
+
+    def loaded(self):
+        return sorted(self._values)
+
+    # --- Artefak ---
+    @property
+    def rfm(self):
+        return self._get("rfm", self._load_rfm)
+
+    @property
+    def transactions(self):
+        return self._get("transactions", self._load_transactions)
+
+    @property
+    def rollup(self):
+        return self._get("rollup", self._load_rollup)
+
+    @property
+    def cluster_profiles(self):
+        return self._get("cluster_profiles", self._load_cluster_profiles)
+
+    @property
+    def catalog(self):
+        return self._get("catalog", self._load_catalog)
+
+    @property
+    def rfm_stats(self):
+        # Statistik global rfm (skala progress bar Customer 360), sekali per versi
+        return self._get("rfm_stats", lambda: rfm_stats(self.rfm))
+
+    def rfm_stats_at(self, as_of=None):
+        # Skala progress bar pada tanggal acuan yang sama dengan RFM customer (index as-of)
+        if as_of is None or self.rfm_history is None: return self.rfm_stats
+        return self._get(f"rfm_stats.{as_of:%Y-%m-%d}", lambda: rfm_stats(self.rfm_history.rfm(as_of)))
+
+    def top_customers(self, per_cluster=3):
+        return self._get(f"top_customers.{per_cluster}", lambda: top_customers(self.rfm, per_cluster))
+
+    @property
+    def rfm_history(self):
+        return self._get("rfm_history", self._load_rfm_history)
+
+    @property
+    def cluster_model(self):
+        return self._get("cluster_model", self._load_cluster_model)
+
+    @property
+    def models(self):
+        return self._get("models", self._load_models)
+
+    @property
+    def customer_index(self):
+        return self._get("customer_index", self._load_customer_index)
+
+    # --- Loaders ---
+    def _load_rfm(self):
+        try: rfm = check_columns("rfm", pd.read_pickle(self._path("rfm.pkl")))
+        except Exception as e: return self._fail("rfm", e, pd.DataFrame())
+        # Satu tipe ID (Int64) untuk semua artefak
+        rfm["Customer ID"] = normalize_customer_ids(rfm["Customer ID"]).to_numpy()
+        return rfm
+
+    def _load_transactions(self):
+        try:
+            if storage_available(self.data_dir): df_full = read_transactions(self.data_dir, columns=APP_COLUMNS)
+            else: df_full = pd.read_csv(self._path("df_full.csv"))
+            check_columns("transactions", df_full)
+        except Exception as e: return self._fail("transactions", e, pd.DataFrame())
+        if not pd.api.types.is_integer_dtype(df_full["Customer ID"]):
+            df_full["Customer ID"] = normalize_customer_ids(df_full["Customer ID"]).to_numpy()
+        return df_full
+
+    def _load_rollup(self):
+        # Cube (Country, YearMonth, Cluster) untuk EDA; dibangun dari df_full bila artefak belum ada
+        try:
+            if rollup_available(self._path(ROLLUP_DIR)): return load_rollup(self._path(ROLLUP_DIR))
+            return build_rollup(self.transactions) if not self.transactions.empty else None
+        except Exception as e: return self._fail("rollup", e, None)
+
+    def _load_cluster_profiles(self):
+        # Snapshot per cluster untuk Cluster Insight; dibangun dari df_full bila belum ada / schema lama
+        try:
+            if cluster_profiles_available(self._path(PROFILES_FILE)):
+                profiles = load_cluster_profiles(self._path(PROFILES_FILE))
+                if profiles is not None: return profiles
+            return build_cluster_profiles(self.transactions, self.rfm) if not self.transactions.empty else None
+        except Exception as e: return self._fail("cluster_profiles", e, None)
+
+    def _load_catalog(self):
+        # Statistik per produk (harga rata-rata, total terjual, rank best seller) untuk kartu produk
+        try:
+            if product_stats_available(self._path(STATS_FILE)): return load_product_stats(self._path(STATS_FILE))
+            return build_product_stats(self.transactions)
+        except Exception as e: return self._fail("catalog", e, pd.DataFrame(columns=["UnitPrice", "Quantity", "Rank"]))
+
+    def _load_rfm_history(self):
+        # Index invoice per customer untuk RFM as-of; dibangun dari 4 kolom df_full bila belum ada
+        try:
+            if rfm_history_available(self._path(HISTORY_DIR)): return load_rfm_history(self._path(HISTORY_DIR))
+            return build_rfm_history(read_transactions(self.data_dir, columns=HISTORY_COLUMNS)) if storage_available(self.data_dir) else None
+        except Exception as e: return self._fail("rfm_history", e, None)
+
+    def _load_cluster_model(self):
+        # Scaler + KMeans tersimpan untuk assign cluster RFM as-of
+        try: return load_cluster_model(self._path(MODEL_FILE)) if os.path.isfile(self._path(MODEL_FILE)) else None
+        except Exception as e: return self._fail("cluster_model", e, None)
+
+    def _load_models(self):
+        try:
+            topN_cluster, user_item_matrix, item_neighbors = load_models(self.base_dir)
+            return check_columns("topN_cluster", topN_cluster), user_item_matrix, item_neighbors
+        except Exception as e: return self._fail("models", e, (None, None, None))
+
+    def _load_customer_index(self):
+        # Customer ID -> posisi baris rfm & user_item_matrix; None bila rfm gagal dimuat (error sudah dicatat)
+        try:
+            if self.rfm.empty: return None
+            _, u_matrix, _ = self.models
+            return CustomerIndex(self.rfm, u_matrix.index if u_matrix is not None else None)
+        except Exception as e: return self._fail("customer_index", e, None)
+
+
+# --- Hot Reload ---
+# Artefak yang dimuat sebelum versi baru diaktifkan (sisanya tetap lazy)
+WARM_ARTIFACTS = ["rfm", "rollup", "cluster_profiles", "catalog", "models", "customer_index"]
+
+
+class LiveStore:
+    def __init__(self, registry_dir=REGISTRY_DIR, fallback_dir=".", poll_s=30.0, warm=WARM_ARTIFACTS, verify_checksums=True):
+        self.registry_dir = registry_dir
+        self.fallback_dir = fallback_dir
+        self.poll_s = poll_s
+        self.warm = list(warm)
+        self.verify_checksums = verify_checksums
+        self.last_error = None
+        self.last_check = None
+        self._rejected = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._unverified = None
+        # Tanpa registry (atau versi aktif rusak): artefak dari folder kerja; versi berikutnya tetap dipantau.
+        # Startup hanya cek manifest + ukuran file; sha256 penuh menyusul di thread background (start)
+        self._current = ArtifactStore(fallback_dir)
+        version = current_version(registry_dir)
+        if version:
+            try:
+                self._current = self._open(version, checksums=False)
+                if verify_checksums: self._unverified = version
+            except ArtifactError as e: self._reject(version, e)
+
+    def snapshot(self):
+        # Satu referensi store untuk satu request/rerun (penukaran versi tidak terlihat di tengah jalan)
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def on_swap(self, fn):
+        # fn(store) dipanggil di thread reload setelah versi baru aktif (mis. service membangun ulang batch)
+        self._listeners.append(fn)
+
+    def _open(self, version, strict=False, checksums=True):
+        path = version_dir(version, self.registry_dir)
+        manifest = verify(path, checksums=checksums) if self.verify_checksums else load_manifest(path)
+        return ArtifactStore(path, version=manifest["version"], strict=strict)
+
+    def _reject(self, version, error):
+        # Versi yang gagal tidak dicoba ulang sampai CURRENT menunjuk versi lain
+        self._rejected = version
+        self.last_error = f"{version}: {error}"
+        warnings.warn(f"Versi artefak {version} ditolak: {error}")
+
+    def reload(self):
+        # Verifikasi + preload versi aktif di registry; store lama tetap melayani sampai penukaran
+        if not registry_available(self.registry_dir): return False
+        with self._reload_lock:
+            self.last_check = time.time()
+            version = current_version(self.registry_dir)
+            if version is None or version in (self._current.version, self._rejected): return False
+            try:
+                with timed("registry.preload"):
+                    store = self._open(version, strict=True)
+                    for name in self.warm: getattr(store, name)
+            except Exception as e:
+                self._reject(version, e)
+                return False
+            # Setelah lolos preload, artefak lazy berikutnya kembali ke fallback + catatan error
+            store.strict = False
+            self._current = store  # penukaran atomic (satu assignment referensi)
+            self.last_error = None
+        self._notify(store, version)
+        return True
+
+    def _notify(self, store, version):
+        for fn in self._listeners:
+            try: fn(store)
+            except Exception as e: self.last_error = f"{version}: listener gagal ({e})"
+
+    def _verify_startup(self):
+        # sha256 penuh versi startup; gagal -> ditolak dan kembali ke artefak folder kerja
+        version, self._unverified = self._unverified, None
+        if version is None: return
+        try:
+            with timed("registry.verify"): verify(version_dir(version, self.registry_dir))
+        except ArtifactError as e:
+            with self._reload_lock:
+                if self._current.version != version: return
+                self._reject(version, e)
+                store = self._current = ArtifactStore(self.fallback_dir)
+            self._notify(store, version)
+
+    def start(self):
+        # Thread daemon: verifikasi checksum versi startup, lalu pantau CURRENT setiap poll_s detik (idempotent)
+        if self._thread is None and (self.poll_s or self._unverified):
+            self._thread = threading.Thread(target=self._watch, daemon=True, name="artifact-reload")
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        self._verify_startup()
+        while self.poll_s:
+            time.sleep(self.poll_s)
+            self.reload()
@@ -0,0 +1,171 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Synthetic Online Retail II Generator ---
+# Data transaksi tiruan dengan bentuk & skew yang mirip online_retail_II.csv, untuk
+# benchmark tanpa dataset asli (pkl di repo hanya LFS pointer, df_full.csv tidak di-commit).
+#   - popularitas produk & aktivitas customer mengikuti power law (Zipf / lognormal)
+#   - ~90% customer dari United Kingdom, puncak musiman di Sep-Nov
+#   - invoice multi-baris, invoice batal ('C...'), Customer ID kosong, POST/M/DOT, duplikat
+# Data mentah ditulis per chunk ke CSV, lalu artefak dashboard dibangun lewat pipeline.py.
+#
+#   python synthetic.py --scale s --out bench_data/s
+#   python synthetic.py --rows 5000000 --products 20000 --customers 20000 --out bench_data/custom
+
+SCALES = {
+    # nama: (rows, products, customers)
+    "xs": (10_000, 1_000, 500),
+    "s": (100_000, 2_000, 2_000),
+    "m": (1_000_000, 5_000, 5_000),
+    "l": (10_000_000, 20_000, 50_000),
+    "xl": (100_000_000, 100_000, 500_000),
+}
+COUNTRIES = ["United Kingdom", "EIRE", "Germany", "France", "Netherlands", "Spain", "Switzerland", "Belgium",
+             "Portugal", "Australia", "Sweden", "Channel Islands", "Italy", "Norway", "Cyprus", "Finland",
+             "Denmark", "Austria", "Japan", "Poland", "USA", "Greece", "Singapore", "Canada", "Israel"]
+NON_PRODUCT = [("POST", "POSTAGE"), ("M", "Manual"), ("DOT", "DOTCOM POSTAGE"), ("C2", "CARRIAGE")]
+WORDS_A = ["WHITE", "RED", "PINK", "BLUE", "VINTAGE", "RETRO", "JUMBO", "SET OF 3", "REGENCY", "HANGING",
+           "PAPER", "GLASS", "HEART", "STAR", "LUNCH", "PARTY", "CHRISTMAS", "WOODEN", "SPOTTY", "FLORAL"]
+WORDS_B = ["T-LIGHT HOLDER", "BAG", "MUG", "CAKE STAND", "LANTERN", "BUNTING", "TIN", "SIGN", "CANDLE",
+           "NAPKINS", "CUSHION COVER", "BOX", "DOORSTOP", "CLOCK", "FRAME", "BOTTLE", "BOWL", "TEA TOWEL"]
+START_DATE = pd.Timestamp("2009-12-01")
+MONTHS = 24
+AVG_LINES = 20          # rata-rata baris per invoice
+CANCEL_RATE = 0.02      # fraksi invoice batal
+GUEST_RATE = 0.2        # fraksi invoice tanpa Customer ID
+NON_PRODUCT_RATE = 0.005
+ZERO_PRICE_RATE = 0.003
+DUPLICATE_RATE = 0.01
+
+
+def _zipf_cdf(n, s):
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return np.cumsum(w / w.sum())
+
+
+def _pick(rng, cdf, size):
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), len(cdf) - 1)
+
+
+class Catalog:
+    # Produk, customer, dan bobotnya; dibuat sekali lalu dipakai semua chunk
+    def __init__(self, n_products, n_customers, seed=0):
+        rng = np.random.default_rng(seed)
+        self.stock_codes = np.array([f"{10000 + i}" + ("A" if i % 7 == 0 else "") for i in range(n_products)])
+        names = [f"{WORDS_A[i % len(WORDS_A)]} {WORDS_B[(i // len(WORDS_A)) % len(WORDS_B)]}" for i in range(n_products)]
+        base = len(WORDS_A) * len(WORDS_B)
+        self.descriptions = np.array([n if i < base else f"{n} {i // base}" for i, n in enumerate(names)])
+        self.prices = np.round(rng.lognormal(1.0, 0.8, n_products), 2).clip(0.1, 300)
+        self.product_cdf = _zipf_cdf(n_products, 1.05)  # produk ke-0 paling laris
+
+        self.customer_ids = np.arange(12346, 12346 + n_customers, dtype=np.int64)
+        activity = rng.lognormal(0.0, 1.3, n_customers)
+        self.customer_cdf = np.cumsum(activity / activity.sum())
+        rest = 1.0 / np.arange(1, len(COUNTRIES)) ** 1.2
+        country_w = np.r_[0.9, 0.1 * rest / rest.sum()]
+        self.customer_country = np.asarray(COUNTRIES)[_pick(rng, np.cumsum(country_w), n_customers)]
+
+        month_w = 1 + 1.5 * np.exp(-0.5 * ((np.arange(MONTHS) % 12 - 11) / 1.2) ** 2)  # puncak Sep-Nov
+        self.month_cdf = np.cumsum(month_w / month_w.sum())
+
+
+def generate_chunk(catalog, rows, rng, first_invoice):
+    # Satu chunk baris mentah (format online_retail_II.csv), mulai dari nomor invoice first_invoice
+    lines = rng.geometric(1 / AVG_LINES, size=rows // AVG_LINES * 2 + 16)
+    lines = lines[:np.searchsorted(np.cumsum(lines), rows) + 1]
+    lines[-1] -= lines.sum() - rows
+    n_inv = len(lines)
+
+    inv_no = first_invoice + np.arange(n_inv)
+    cust = _pick(rng, catalog.customer_cdf, n_inv)
+    month = _pick(rng, catalog.month_cdf, n_inv)
+    ts = (START_DATE + pd.to_timedelta(month * 30.4 + rng.random(n_inv) * 30.4, unit="D")).floor("min")
+    cancel = rng.random(n_inv) < CANCEL_RATE
+    guest = rng.random(n_inv) < GUEST_RATE
+
+    inv_of_line = np.repeat(np.arange(n_inv), lines)
+    prod = _pick(rng, catalog.product_cdf, rows)
+    qty = np.minimum(rng.zipf(1.8, rows), 480).astype(np.int64)
+    qty[cancel[inv_of_line]] *= -1
+    price = np.round(catalog.prices[prod] * rng.choice([1.0, 1.0, 1.0, 0.85, 1.25], rows), 2)
+    stock = catalog.stock_codes[prod].astype(object)
+    desc = catalog.descriptions[prod].astype(object)
+
+    special = rng.random(rows) < NON_PRODUCT_RATE
+    kind = rng.integers(0, len(NON_PRODUCT), special.sum())
+    stock[special] = [NON_PRODUCT[k][0] for k in kind]
+    desc[special] = [NON_PRODUCT[k][1] for k in kind]
+    price[rng.random(rows) < ZERO_PRICE_RATE] = 0.0
+
+    invoice = np.char.add(np.where(cancel, "C", ""), inv_no.astype(str))[inv_of_line]
+    customer = np.where(guest, np.nan, catalog.customer_ids[cust].astype(np.float64))[inv_of_line]
+    df = pd.DataFrame({
+        "Invoice": invoice,
+        "StockCode": stock,
+        "Description": desc,
+        "Quantity": qty,
+        "InvoiceDate": ts[inv_of_line],
+        "Price": price,
+        "Customer ID": customer,
+        "Country": catalog.customer_country[cust][inv_of_line],
+    })
+    dup = rng.random(rows) < DUPLICATE_RATE
+    if dup.any(): df = pd.concat([df, df[dup]], ignore_index=True)
+    return df, first_invoice + n_inv
+
+
+def iter_transactions(rows, products, customers, chunk_rows=1_000_000, seed=0):
+    catalog = Catalog(products, customers, seed)
+    rng = np.random.default_rng(seed + 1)
+    invoice = 489434
+    for start in range(0, rows, chunk_rows):
+        chunk, invoice = generate_chunk(catalog, min(chunk_rows, rows - start), rng, invoice)
+        yield chunk
+
+
+def write_raw(path, chunks):
+    # CSV bertahap (append per chunk) supaya 100M baris tidak perlu muat di memori
+    total = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False, date_format="%Y-%m-%d %H:%M:%S")
+        total += len(chunk)
+    return total
+
+
+def build(out_dir, rows, products, customers, k=4, chunk_rows=1_000_000, seed=0, raw_only=False):
+    from pipeline import run
+    os.makedirs(out_dir, exist_ok=True)
+    raw_path = os.path.join(out_dir, "online_retail_synthetic.csv")
+    t0 = time.perf_counter()
+    total = write_raw(raw_path, iter_transactions(rows, products, customers, chunk_rows, seed))
+    print(f"[synthetic] {total:,} baris mentah -> {raw_path} ({time.perf_counter() - t0:.1f}s)")
+    if raw_only: return raw_path
+    # rfm / topN_cluster / user_item_matrix / item neighbors / rollup / parquet lewat pipeline yang sama
+    run(raw_path, stage="artifacts", k=k, out_dir=out_dir, cache_dir=os.path.join(out_dir, ".pipeline_cache"))
+    return raw_path
+
+
+def main():
+    p = argparse.ArgumentParser(description="Generator data Online Retail II sintetis + artefak dashboard.")
+    p.add_argument("--scale", choices=list(SCALES), default="s", help="Preset ukuran (rows, products, customers)")
+    p.add_argument("--rows", type=int, default=None)
+    p.add_argument("--products", type=int, default=None)
+    p.add_argument("--customers", type=int, default=None)
+    p.add_argument("--k", type=int, default=4, help="Jumlah cluster")
+    p.add_argument("--chunk-rows", type=int, default=1_000_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--raw-only", action="store_true", help="Hanya tulis CSV mentah, tanpa artefak")
+    p.add_argument("--out", required=True, help="Folder output")
+    args = p.parse_args()
+
+    rows, products, customers = SCALES[args.scale]
+    build(args.out, args.rows or rows, args.products or products, args.customers or customers,
+          k=args.k, chunk_rows=args.chunk_rows, seed=args.seed, raw_only=args.raw_only)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from incremental import FEATURES, _write_outputs, apply_batch, build_state
+from item_neighbors import build_item_neighbors_sparse, save_item_neighbors
+from recommender import recommend_products
+from store import ArtifactStore
+from user_item import from_transactions, load_user_item, save_user_item
+from vocab import build_vocabulary, save_vocabulary
+
+
+def _transactions():
+    rows = [
+        ("100", 1, "ALPHA", 2, "2011-01-03", 1.0), ("100", 1, "BETA", 1, "2011-01-03", 2.0),
+        ("101", 2, "BETA", 3, "2011-01-10", 2.0), ("102", 3, "GAMMA", 1, "2011-02-01", 5.0),
+        ("103", 3, "ALPHA", 4, "2011-02-05", 1.0), ("104", 2, "GAMMA", 2, "2011-02-07", 5.0),
+    ]
+    df = pd.DataFrame(rows, columns=["Invoice", "Customer ID", "Description", "Quantity", "InvoiceDate", "Price"])
+    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"])
+    df["Revenue"] = df["Quantity"] * df["Price"]
+    return df
+
+
+def _raw(rows):
+    return pd.DataFrame(rows, columns=["Invoice", "StockCode", "Description", "Quantity", "InvoiceDate", "Price", "Customer ID", "Country"])
+
+
+def _build(tmp_path, monkeypatch):
+    # Artefak minimal seperti pipeline.stage_artifacts (vocab bersama), lalu state incremental
+    monkeypatch.chdir(tmp_path)
+    df = _transactions()
+    reference = df["InvoiceDate"].max() + pd.Timedelta(days=1)
+    rfm = df.groupby("Customer ID").agg(Last=("InvoiceDate", "max"), Frequency=("Invoice", "nunique"), Monetary=("Revenue", "sum"))
+    rfm["Recency"] = (reference - rfm.pop("Last")).dt.days
+    rfm = rfm.reset_index()[["Customer ID"] + FEATURES]
+    scaler = MinMaxScaler().fit(rfm[FEATURES])
+    kmeans = KMeans(n_clusters=2, random_state=0, n_init=10).fit(scaler.transform(rfm[FEATURES]))
+    rfm["Cluster"] = kmeans.labels_
+    model = {"scaler": scaler, "kmeans": kmeans, "label_map": np.arange(2), "features": FEATURES}
+
+    df_full = df.merge(rfm[["Customer ID", "Cluster"]], on="Customer ID")
+    vocab = build_vocabulary(df_full)
+    user_item = from_transactions(df_full, vocab)
+    save_vocabulary(vocab)
+    save_user_item(user_item, shared_vocab=True)
+    save_item_neighbors(build_item_neighbors_sparse(user_item, k=2, workers=1), shared_vocab=True)
+    top = df_full.groupby(["Cluster", "Description"])["Quantity"].sum().reset_index()
+    with open("topN_cluster.pkl", "wb") as f:
+        pickle.dump(top.assign(Item=vocab.product_codes(top["Description"]))[["Cluster", "Item", "Quantity"]], f)
+    rfm.to_pickle("rfm.pkl")
+    return build_state(df_full, rfm), model
+
+
+def test_batch_with_new_product_and_customer_reloads(tmp_path, monkeypatch):
+    state, model = _build(tmp_path, monkeypatch)
+    raw = _raw([
+        ("200", "85123A", "DELTA", 2, "2011-03-01", 3.0, 99, "United Kingdom"),
+        ("201", "85123A", "ALPHA", 1, "2011-03-02", 1.0, 1, "United Kingdom"),
+    ])
+    state, user_item, new_rows = apply_batch(state, model, raw, load_user_item(mmap=False))
+    _write_outputs(state, user_item, new_rows=new_rows)
+
+    store = ArtifactStore(str(tmp_path))
+    topN, u_matrix, i_nbrs = store.models
+    assert "models" not in store.errors
+    assert u_matrix.items.dtype.kind == "U" and "DELTA" in u_matrix.items.tolist()
+    assert store.customer_index.matrix_row(99) >= 0
+    res, err = recommend_products(99, store.customer_index, topN, u_matrix, i_nbrs)
+    assert err is None and res["Bought List"] == ["DELTA"]
+
+
+def test_resent_invoice_is_ignored(tmp_path, monkeypatch):
+    state, model = _build(tmp_path, monkeypatch)
+    before = state.customers.loc[1, ["Frequency", "Monetary"]].tolist()
+    raw = _raw([("100", "85123A", "ALPHA", 2, "2011-01-03", 1.0, 1, "United Kingdom")])
+    state, user_item, new_rows = apply_batch(state, model, raw, load_user_item(mmap=False))
+    assert new_rows.empty
+    assert state.customers.loc[1, ["Frequency", "Monetary"]].tolist() == before
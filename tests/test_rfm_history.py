@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from rfm_history import build_rfm_history, merge_rfm_history
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=["Invoice", "InvoiceDate", "Customer ID", "Revenue"])
+    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"])
+    return df
+
+
+BASE = [("100", "2011-01-05", 1, 10.0), ("101", "2011-02-01", 2, 5.0), ("102", "2011-03-01", 1, 7.5)]
+
+
+def test_merge_matches_full_build():
+    # Customer baru + invoice bertanggal sebelum t0 harus sama dengan build dari seluruh data
+    batch = [("200", "2010-12-20", 2, 4.0), ("201", "2011-02-10", 3, 8.0), ("202", "2011-03-05", 1, 1.0)]
+    merged = merge_rfm_history(build_rfm_history(_frame(BASE)), _frame(batch))
+    full = build_rfm_history(_frame(BASE + batch))
+    for ref in [None, "2011-02-15", "2011-01-01"]:
+        ref = pd.Timestamp(ref) if ref else None
+        pd.testing.assert_frame_equal(merged.rfm(ref), full.rfm(ref))
+
+
+def test_merge_skips_seen_invoices():
+    history = build_rfm_history(_frame(BASE))
+    seen = np.array(sorted(inv for inv, *_ in BASE))
+    merged = merge_rfm_history(history, _frame([("100", "2011-01-05", 1, 10.0)]), seen)
+    pd.testing.assert_frame_equal(merged.rfm(), history.rfm())
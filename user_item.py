@@ -0,0 +1,123 @@
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from registry import is_published
+from vocab import load_vocabulary, vocab_dir_of
+
+# --- Sparse User-Item Matrix (memory-mapped) ---
+# Versi read-only dari user_item_matrix.pkl: Quantity > 0 per (customer, produk) dalam CSR.
+# Disimpan sebagai file .npy tanpa kompresi sehingga bisa dibuka dengan mmap_mode="r":
+# semua session / proses berbagi page cache yang sama, tanpa deserialisasi dan tanpa copy.
+# Build pipeline: baris = kode customer, kolom = kode produk dari vocab bersama; index/items
+# tidak disimpan di folder ini melainkan dibaca dari vocab/ saat load.
+
+USER_ITEM_DIR = "user_item"
+LEGACY_FILE = "user_item_matrix.pkl"
+ARRAYS = ["index", "items", "data", "indices", "indptr"]
+
+
+class UserItemMatrix:
+    def __init__(self, customer_ids, items, data, indices, indptr):
+        self.index = customer_ids   # int64 Customer ID per baris
+        self.items = items          # nama produk per kolom
+        self.data, self.indices, self.indptr = data, indices, indptr
+        self._csr = None
+
+    @property
+    def shape(self):
+        return len(self.index), len(self.items)
+
+    def __len__(self):
+        return len(self.index)
+
+    def row(self, m):
+        # Kode produk (urut kolom) + Quantity yang dibeli customer di baris m
+        start, end = self.indptr[m], self.indptr[m + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def tocsr(self):
+        # Dibungkus tanpa copy: scipy memakai array (mmap) apa adanya
+        if self._csr is None:
+            self._csr = sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+        return self._csr
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+
+def from_frame(user_item_matrix):
+    values = user_item_matrix.to_numpy(dtype=np.float32)
+    csr = sparse.csr_matrix(np.where(values > 0, values, 0))
+    csr.sort_indices()
+    ids = pd.to_numeric(pd.Series(user_item_matrix.index), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+    # indices & indptr satu dtype, supaya scipy tidak meng-upcast (copy) saat dibungkus
+    idx_dtype = np.int32 if csr.nnz < np.iinfo(np.int32).max else np.int64
+    return UserItemMatrix(ids, user_item_matrix.columns.to_numpy().astype(str), csr.data.astype(np.float32),
+                          csr.indices.astype(idx_dtype), csr.indptr.astype(idx_dtype))
+
+
+def from_transactions(df, vocab=None):
+    # Langsung dari transaksi (groupby per pasangan), tanpa pivot dense customer x produk.
+    # Baris/kolom sama dengan pivot_table: semua customer & produk, urut naik.
+    # Dengan vocab: baris/kolom = kode vocab (transaksi tanpa Customer ID dilewati).
+    quantity = df["Quantity"].to_numpy(dtype=np.float64)
+    if vocab is not None:
+        ids, items = vocab.customers, vocab.products
+        rows, cols = vocab.customer_codes(df["Customer ID"]), vocab.product_codes(df["Description"])
+        keep = (rows >= 0) & (cols >= 0)
+        rows, cols, quantity = rows[keep], cols[keep], quantity[keep]
+    else:
+        cids = pd.to_numeric(df["Customer ID"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        ids, rows = np.unique(cids, return_inverse=True)
+        items, cols = np.unique(df["Description"].astype(str).to_numpy(), return_inverse=True)
+    qty = pd.Series(quantity).groupby([rows, cols]).sum()
+    qty = qty[qty > 0]
+    csr = sparse.csr_matrix((qty.to_numpy(dtype=np.float32), (qty.index.get_level_values(0), qty.index.get_level_values(1))),
+                            shape=(len(ids), len(items)))
+    csr.sort_indices()
+    idx_dtype = np.int32 if csr.nnz < np.iinfo(np.int32).max else np.int64
+    return UserItemMatrix(ids, items if vocab is not None else items.astype(str), csr.data.astype(np.float32),
+                          csr.indices.astype(idx_dtype), csr.indptr.astype(idx_dtype))
+
+
+def save_user_item(uim, path=USER_ITEM_DIR, shared_vocab=False):
+    # shared_vocab: index & items sudah ada di vocab/ (hanya array CSR yang ditulis)
+    arrays = {name: np.asarray(getattr(uim, name)) for name in ARRAYS if not (shared_vocab and name in ("index", "items"))}
+    objects = [name for name, arr in arrays.items() if arr.dtype == object]
+    if objects: raise ValueError(f"user_item: array {objects} ber-dtype object (tidak bisa di-mmap)")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"  # unik per proses (beberapa worker bisa menulis bersamaan)
+    os.makedirs(tmp)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    shutil.rmtree(path, ignore_errors=True)
+    try: os.replace(tmp, path)
+    finally: shutil.rmtree(tmp, ignore_errors=True)  # sisa tmp bila proses lain lebih dulu mengganti path
+
+
+def load_user_item(path=USER_ITEM_DIR, mmap=True, vocab=None):
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+              for name in ARRAYS if os.path.isfile(os.path.join(path, f"{name}.npy"))}
+    if "items" not in arrays:
+        vocab = vocab or load_vocabulary(vocab_dir_of(path), mmap)
+        arrays["index"], arrays["items"] = vocab.customers, vocab.products
+    return UserItemMatrix(*[arrays[name] for name in ARRAYS])
+
+
+def load_or_build_user_item(path=USER_ITEM_DIR, legacy_pkl=None, vocab=None):
+    # Fallback: user_item_matrix.pkl (dense) dikonversi sekali lalu disimpan.
+    # Di folder versi registry hanya dikonversi di memori (versi publish tidak boleh berubah).
+    if os.path.isdir(path): return load_user_item(path, vocab=vocab)
+    legacy_pkl = legacy_pkl or os.path.join(os.path.dirname(path), LEGACY_FILE)
+    uim = from_frame(pd.read_pickle(legacy_pkl))
+    if is_published(path): return uim
+    try:
+        save_user_item(uim, path)
+        return load_user_item(path)
+    except OSError:
+        return uim
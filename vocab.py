@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from customer_index import IdIndex, normalize_customer_ids
+
+# --- Shared Vocabulary ---
+# Produk (Description) dan customer (Customer ID) dipetakan sekali ke kode int32 padat.
+# Artefak hasil pipeline (user_item, item_neighbors, topN_cluster) hanya menyimpan kode;
+# nama produk / ID customer diambil dari vocab ini saat load dan di-decode saat tampil.
+# Urutan = urut naik (sama dengan kolom/baris pivot_table). Artefak yang masih menyimpan
+# items/index sendiri (versi lama, output incremental.py) tetap dibaca apa adanya.
+
+VOCAB_DIR = "vocab"
+ARRAYS = ["products", "customers"]
+
+
+class Vocabulary:
+    def __init__(self, products, customers):
+        self.products = np.asarray(products)    # kode produk -> Description
+        self.customers = np.asarray(customers)  # kode customer -> Customer ID (int64)
+        self._product_index = None
+        self._customer_index = None
+
+    def __len__(self):
+        return len(self.products)
+
+    def product_codes(self, names):
+        # Description -> kode (-1 = tidak ada di vocab)
+        if self._product_index is None: self._product_index = pd.Index(self.products.astype(str))
+        return self._product_index.get_indexer(np.asarray(names).astype(str)).astype(np.int32)
+
+    def customer_codes(self, ids):
+        # Customer ID -> kode (-1 = tidak ada), lookup O(1) lewat IdIndex
+        if self._customer_index is None: self._customer_index = IdIndex(self.customers)
+        ids = normalize_customer_ids(ids).fillna(-1).to_numpy(dtype=np.int64)
+        return self._customer_index.get_many(ids)
+
+    def nbytes(self):
+        return self.products.nbytes + self.customers.nbytes
+
+
+def build_vocabulary(df):
+    products = np.unique(df["Description"].astype(str).to_numpy())
+    customers = np.unique(normalize_customer_ids(df["Customer ID"]).dropna().to_numpy(dtype=np.int64))
+    return Vocabulary(products, customers)
+
+
+def same_products(a, b):
+    # True bila dua artefak memakai urutan kode produk yang sama (remap tidak perlu)
+    return a is b or (len(a) == len(b) and np.array_equal(np.asarray(a).astype(str), np.asarray(b).astype(str)))
+
+
+def vocab_dir_of(path):
+    # Vocab bersama berada satu folder dengan artefak (user_item/, item_neighbors/, ...)
+    return os.path.join(os.path.dirname(os.path.abspath(path)), VOCAB_DIR)
+
+
+def save_vocabulary(vocab, path=VOCAB_DIR):
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "products.npy"), vocab.products.astype(str))
+    np.save(os.path.join(tmp, "customers.npy"), vocab.customers.astype(np.int64))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def load_vocabulary(path=VOCAB_DIR, mmap=True):
+    mode = "r" if mmap else None
+    return Vocabulary(*[np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS])
+
+
+def vocabulary_available(path=VOCAB_DIR):
+    return os.path.isdir(path)